@@ -0,0 +1,84 @@
+"""
+benchmarks/matcher.py — Gallery.predict()/predict_many() vs LBPHFaceRecognizer.predict().
+
+Run from the repo root:
+    python benchmarks/matcher.py [--samples 2000] [--batch 50] [--batch-samples 400]
+
+Wajah sintetis (noise yang di-blur, 100x100) dipakai sebagai gallery, jadi
+benchmark ini tidak butuh dataset maupun kamera. Label dan jarak dari kedua
+jalur dibandingkan supaya hasil yang lebih cepat juga terbukti sama.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from facerecog import lbp                 # noqa: E402
+from facerecog.gallery import Gallery     # noqa: E402
+
+
+def _faces(n: int, rng: np.random.Generator) -> np.ndarray:
+    noise = rng.integers(0, 256, (n, 100, 100), dtype=np.uint8)
+    return np.stack([cv2.GaussianBlur(face, (3, 3), 0) for face in noise])
+
+
+def _best(fn, repeat: int) -> float:
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _case(title: str, samples: int, queries: int, repeat: int, rng: np.random.Generator) -> None:
+    faces = _faces(samples, rng)
+    probes = faces[rng.integers(0, samples, queries)][:, ::-1, :].copy()   # dicerminkan: bukan duplikat persis
+
+    recognizer = cv2.face.LBPHFaceRecognizer_create(lbp.RADIUS, lbp.NEIGHBORS, lbp.GRID_X, lbp.GRID_Y)
+    recognizer.train(list(faces), np.arange(samples, dtype=np.int32))
+    gallery = Gallery.from_recognizer(recognizer)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.lbph")
+        gallery.save(path, "uint16")
+        mapped = Gallery.load(path)
+
+        expected = [recognizer.predict(p) for p in probes]
+        got = gallery.predict_many(probes)
+        assert [l for l, _ in got] == [l for l, _ in expected], "label berbeda dari OpenCV"
+        err = max(abs(c - e) for (_, c), (_, e) in zip(got, expected))
+
+        t_cv  = _best(lambda: [recognizer.predict(p) for p in probes], repeat)
+        t_np  = _best(lambda: gallery.predict_many(probes), repeat)
+        t_map = _best(lambda: mapped.predict_many(probes), repeat)
+
+    print(f"\n{title}: {queries} query x {samples} sampel (selisih jarak maks {err:.2e})")
+    print(f"  LBPHFaceRecognizer.predict   : {t_cv * 1000:8.1f} ms")
+    print(f"  Gallery float32              : {t_np * 1000:8.1f} ms  ({t_cv / t_np:.2f}x)")
+    print(f"  Gallery .lbph uint16 (mmap)  : {t_map * 1000:8.1f} ms  ({t_cv / t_map:.2f}x)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000, help="Sampel gallery untuk satu query.")
+    parser.add_argument("--batch", type=int, default=50, help="Jumlah query untuk kasus batch.")
+    parser.add_argument("--batch-samples", type=int, default=400, help="Sampel gallery untuk kasus batch.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    _case("Satu query", args.samples, 1, args.repeat, rng)
+    _case("Batch", args.batch_samples, args.batch, args.repeat, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -109,8 +109,8 @@ def menu_delete_user():
         return
     try:
         info = fr.delete_user(name)
-        print(f"[✓] '{info['name']}' deleted ({info['photos_deleted']} photos removed).")
-        print("[*] Re-train the model for changes to take effect.")
+        print(f"[✓] '{info['name']}' deleted ({info['photos_deleted']} photos removed, "
+              f"{info['samples_removed']} samples removed from model).")
     except ValueError as e:
         print(f"[!] {e}")
 
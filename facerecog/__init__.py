@@ -31,22 +31,41 @@ Quick start:
     # Delete user
     fr.delete_user("Alice")
 
+    # Separate data root
+    fr_b = FaceRecog(config=Config(base_dir="/srv/faces/site-b"))
+
+Importing the package is cheap: OpenCV, numpy and the heavy submodules are
+only loaded by the first method that needs them, and no directories are
+created until something is written.
+
 For a full interactive CLI demo, run:
     python facerecog/example.py
 """
 
+import importlib
+
 from .config import (
-    BASE_DIR, DATASET_DIR, TRAINER_DIR,
-    LABELS_FILE, MODEL_PATH, CASCADE_PATH,
-    MAX_PHOTOS, CONFIDENCE_THRESHOLD,
+    Config,
+    MAX_PHOTOS, CONFIDENCE_THRESHOLD, DEDUP_MIN_DISTANCE, MIN_SHARPNESS,
 )
+from . import config  as _config_mod
 from . import labels  as _labels_mod
-from . import dataset as _dataset_mod
-from . import trainer as _trainer_mod
-from . import detector as _detector_mod
 from . import users   as _users_mod
 
-from .detector import DetectionResult, FaceResult
+from .results import DetectionResult, FaceResult
+from .events import EventLog
+
+
+def _lazy(name: str):
+    """Import submodul berat (cv2/numpy) saat pertama kali dibutuhkan."""
+    return importlib.import_module(f".{name}", __name__)
+
+
+def __getattr__(name: str):
+    # Konstanta path lama (BASE_DIR, DATASET_DIR, ...) di-resolve saat diakses.
+    if name in _config_mod._PATH_ATTRS or name == "CASCADE_PATH":
+        return getattr(_config_mod, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class FaceRecog:
@@ -61,22 +80,41 @@ class FaceRecog:
 
     def __init__(
         self,
-        threshold: int = CONFIDENCE_THRESHOLD,
-        max_photos: int = MAX_PHOTOS,
+        threshold: float | None = None,
+        max_photos: int | None = None,
         camera_index: int = 0,
         app_name: str = "Face Recognition",
+        min_distance: int | None = None,
+        min_sharpness: float | None = None,
+        config: Config | None = None,
+        events: EventLog | None = None,
     ):
         """
         Args:
-            threshold   : LBPH confidence limit (default 75). Lower = stricter.
-            max_photos  : Photos per camera registration session (default 40).
-            camera_index: Camera index to use (default 0).
-            app_name    : Application name shown in OpenCV window titles.
+            threshold    : LBPH confidence limit (default 75). Lower = stricter.
+            max_photos   : Photos per camera registration session (default 40).
+            camera_index : Camera index to use (default 0).
+            app_name     : Application name shown in OpenCV window titles.
+            min_distance : Registration skips faces whose dHash differs from an
+                           already accepted photo by fewer bits (default 6, 0 = off).
+            min_sharpness: Registration skips faces blurrier than this
+                           Laplacian variance (default 0 = off).
+            config       : Paths and settings (default: Config() rooted at the
+                           current working directory). Arguments left as None
+                           take their value from it.
+            events       : Optional EventLog that receives every face seen by
+                           detect_camera()/detect_image(), written in batches
+                           by a background thread.
         """
-        self.threshold    = threshold
-        self.max_photos   = max_photos
-        self.camera_index = camera_index
-        self.app_name     = app_name
+        self.config        = config or Config()
+        self.threshold     = self.config.confidence_threshold if threshold is None else threshold
+        self.max_photos    = self.config.max_photos if max_photos is None else max_photos
+        self.camera_index  = camera_index
+        self.app_name      = app_name
+        self.min_distance  = self.config.dedup_min_distance if min_distance is None else min_distance
+        self.min_sharpness = self.config.min_sharpness if min_sharpness is None else min_sharpness
+        self.events        = events
+        self._model        = None   # ModelHandle, dibuat saat deteksi pertama
 
     # ── Registrasi ───────────────────────────────────────────────────────────
 
@@ -97,13 +135,16 @@ class FaceRecog:
         Returns:
             Jumlah foto yang tersimpan.
         """
-        saved = _dataset_mod.register_from_camera(
+        saved = _lazy("dataset").register_from_camera(
             name=name,
             overwrite=overwrite,
             append=append,
             max_photos=self.max_photos,
             camera_index=self.camera_index,
             app_name=self.app_name,
+            min_distance=self.min_distance,
+            min_sharpness=self.min_sharpness,
+            config=self.config,
         )
         return saved
 
@@ -126,33 +167,139 @@ class FaceRecog:
         Returns:
             Jumlah foto wajah yang tersimpan.
         """
-        saved = _dataset_mod.register_from_image(
+        saved = _lazy("dataset").register_from_image(
             name=name,
             src=src,
             overwrite=overwrite,
             append=append,
+            min_distance=self.min_distance,
+            min_sharpness=self.min_sharpness,
+            config=self.config,
         )
         return saved
 
+    def normalize_dataset(self) -> dict:
+        """
+        Normalisasi crop lama di dataset/ ke ukuran seragam (config.face_size).
+        Hanya langkah yang belum tercatat di normalization.json yang diterapkan.
+
+        Returns:
+            dict: {"files": int, "normalized": int, "bytes_before": int, "bytes_after": int}
+        """
+        return _lazy("dataset").normalize_dataset(config=self.config)
+
     # ── Training ─────────────────────────────────────────────────────────────
 
-    def train(self) -> dict:
+    def train(
+        self,
+        model_format: str = "yml",
+        dtype: str = "float32",
+        shards: int = 0,
+        chunk_size: int | None = None,
+        cache: bool = True,
+    ) -> dict:
         """
         Latih model dari seluruh dataset yang tersedia.
 
+        Args:
+            model_format: "yml" (default) atau "lbph" — format biner ringkas
+                          yang dimuat jauh lebih cepat.
+            dtype       : Tipe histogram untuk "lbph": "float32", "float16", "uint16".
+            shards      : > 0 = bagi user ke beberapa shard yang dilatih paralel;
+                          hanya shard yang berubah yang dilatih ulang, dan
+                          pencarian dijalankan paralel di semua shard.
+            chunk_size  : Proses foto per chunk berukuran ini agar memori puncak
+                          tidak bergantung pada ukuran dataset (None = sekaligus).
+            cache       : Pakai ulang histogram foto yang tidak berubah dari
+                          trainer/cache/; hanya foto baru/berubah yang di-decode.
+
+        Returns:
+            dict: {"total_images": int, "total_persons": int, "model_path": str,
+                   "peak_memory_mb": float | None, "cached": int, "decoded": int}
+            peak_memory_mb is the process-lifetime max RSS (not per call,
+            not summed over worker processes).
+        """
+        info = _lazy("trainer").train(
+            model_format=model_format, dtype=dtype, shards=shards, chunk_size=chunk_size,
+            cache=cache, config=self.config,
+        )
+        if self._model is not None:
+            self._model.reload()
+        return info
+
+    def convert_model(self, dtype: str = "float32") -> dict:
+        """
+        Konversi trainer.yml yang sudah ada ke format biner trainer.lbph.
+
+        Args:
+            dtype: "float32" (lossless), "float16" atau "uint16" (setengah ukuran).
+
+        Returns:
+            dict: {"samples": int, "yml_bytes": int, "lbph_bytes": int, "model_path": str}
+        """
+        info = _lazy("gallery").convert_yml(dtype=dtype, config=self.config)
+        self.reload_model()
+        return info
+
+    def compact(
+        self,
+        max_per_user: int | None = None,
+        caps: dict[str, int] | None = None,
+        dry_run: bool = False,
+    ) -> dict:
+        """
+        Pangkas foto redundan: simpan paling banyak `max_per_user` sampel
+        representatif per user (dipilih berdasarkan jarak histogram LBP),
+        lalu latih ulang model.
+
+        Args:
+            max_per_user: Batas sampel per user (default 30).
+            caps        : Batas khusus per nama, mis. {"Alice": 50}.
+            dry_run     : Hanya laporkan, jangan hapus apa pun.
+
         Returns:
-            dict: {"total_images": int, "total_persons": int, "model_path": str}
+            dict: {"users": [...], "samples_removed": int,
+                   "bytes_before": int, "bytes_after": int, "train": dict | None}
         """
-        return _trainer_mod.train()
+        compact = _lazy("compact")
+        info = compact.compact(
+            max_per_user=compact.MAX_PER_USER if max_per_user is None else max_per_user,
+            caps=caps, dry_run=dry_run, config=self.config,
+        )
+        if info["train"] and self._model is not None:
+            self._model.reload()
+        return info
 
     # ── Deteksi ──────────────────────────────────────────────────────────────
 
+    def _model_handle(self):
+        if self._model is None:
+            self._model = _lazy("detector").ModelHandle(config=self.config)
+        return self._model
+
+    def reload_model(self) -> None:
+        """
+        Signal running detection sessions to load the latest model.
+
+        Safe to call from another thread while detect_camera() is running;
+        the new model is loaded in the background and swapped in between frames.
+        """
+        if self._model is not None:
+            self._model.request_reload()
+
     def detect_camera(self) -> None:
-        """Detect and recognize faces in real-time from camera."""
-        _detector_mod.detect_camera(
+        """
+        Detect and recognize faces in real-time from camera.
+
+        A retrained model is picked up automatically without restarting.
+        """
+        _lazy("detector").detect_camera(
             threshold=self.threshold,
             camera_index=self.camera_index,
             app_name=self.app_name,
+            model=self._model_handle(),
+            config=self.config,
+            events=self.events,
         )
 
     def detect_image(self, img_path: str, show: bool = True) -> DetectionResult:
@@ -166,13 +313,55 @@ class FaceRecog:
         Returns:
             DetectionResult — access `.faces` for list of FaceResult.
         """
-        return _detector_mod.detect_image(
+        return _lazy("detector").detect_image(
             img_path=img_path,
             threshold=self.threshold,
             show=show,
             app_name=self.app_name,
+            model=self._model_handle(),
+            config=self.config,
+            events=self.events,
         )
 
+    def recognize_faces(self, crops) -> list[FaceResult]:
+        """
+        Recognize faces that are already cropped (and ideally aligned),
+        skipping Haar detection entirely, with the same model and labels as
+        detect_image().
+
+        Args:
+            crops: List of face crops (grayscale or BGR), or a stacked array
+                   (N, H, W) / (N, H, W, C). Wrap a single colour crop in a list.
+
+        Returns:
+            One FaceResult per crop, in input order.
+        """
+        return _lazy("detector").recognize_faces(
+            crops,
+            threshold=self.threshold,
+            model=self._model_handle(),
+            config=self.config,
+            events=self.events,
+        )
+
+    def evaluate(self, test_dir: str | None = None, **grid) -> list[dict]:
+        """
+        Sweep accuracy/latency over detector settings and thresholds.
+
+        Args:
+            test_dir: Labeled held-out folder `<test_dir>/<name>/*.jpg` of full images.
+                      None = hold out part of dataset/ instead (crops: only
+                      thresholds are swept, detection is skipped).
+            **grid  : scale_factors, min_neighbors, min_sizes, thresholds,
+                      holdout, impostors, workers, seed — see evaluate.sweep().
+
+        Returns:
+            List of dict per setting (best accuracy first) with accuracy,
+            false_accept_rate, misidentification_rate, detection_rate,
+            latency_mean_ms, latency_p95_ms.
+        """
+        return _lazy("evaluate").sweep(test_dir=test_dir, config=self.config, **grid)
+
     # ── Manajemen Pengguna ───────────────────────────────────────────────────
 
     def list_users(self) -> list[dict]:
@@ -182,24 +371,41 @@ class FaceRecog:
         Returns:
             List of dict: [{"id": int, "name": str, "photos": int}, ...]
         """
-        return _users_mod.list_users()
+        return _users_mod.list_users(self.config)
 
-    def delete_user(self, name: str) -> dict:
+    def delete_user(self, name: str, update_model: bool = True) -> dict:
         """
         Hapus pengguna dan seluruh data fotonya.
 
         Args:
-            name: Nama pengguna (case-insensitive).
+            name        : Nama pengguna (case-insensitive).
+            update_model: Hapus juga sampelnya dari model — tidak perlu train() ulang.
+
+        Returns:
+            dict: {"id": int, "name": str, "photos_deleted": int, "samples_removed": int}
+        """
+        return self.delete_users([name], update_model=update_model)[0]
+
+    def delete_users(self, names: list[str], update_model: bool = True) -> list[dict]:
+        """
+        Hapus banyak pengguna sekaligus (model hanya ditulis ulang sekali).
+
+        Args:
+            names       : Daftar nama pengguna (case-insensitive).
+            update_model: Hapus juga sampel mereka dari model.
 
         Returns:
-            dict: {"id": int, "name": str, "photos_deleted": int}
+            List of dict seperti delete_user().
         """
-        return _users_mod.delete_user(name)
+        info = _users_mod.delete_users(names, update_model=update_model, config=self.config)
+        if self._model is not None:
+            self._model.reload()
+        return info
 
     # ── Info ─────────────────────────────────────────────────────────────────
 
     def __repr__(self) -> str:
-        users = _labels_mod.load()
+        users = _labels_mod.load(self.config)
         return (
             f"FaceRecog("
             f"app_name='{self.app_name}', "
@@ -209,4 +415,4 @@ class FaceRecog:
         )
 
 
-__all__ = ["FaceRecog", "DetectionResult", "FaceResult"]
+__all__ = ["FaceRecog", "Config", "EventLog", "DetectionResult", "FaceResult"]
@@ -0,0 +1,228 @@
+"""
+facerecog/cache.py
+Cache histogram LBP untuk training berulang.
+
+Hampir seluruh waktu training habis untuk decode JPEG dan menghitung histogram
+LBP setiap foto, padahal kebanyakan foto tidak berubah sejak training
+sebelumnya. Cache menyimpan histogram setiap foto, dengan kunci path + mtime +
+ukuran file. Training berikutnya hanya men-decode foto yang baru atau berubah.
+
+Histogram LBPH adalah jumlah piksel per bin dibagi jumlah piksel sel, jadi
+disimpan persis sebagai hitungan bilangan bulat (uint8 untuk crop 100x100).
+Satu baris berukuran 16 KB, bukan 64 KB float32. File array di-memory-map
+langsung menjadi Gallery (scale = 1 / piksel per sel).
+
+Layout di config.cache_dir:
+    index.json        — parameter + daftar [path relatif, mtime_ns, size, valid] per baris
+    hist-<token>.npy  — array (N, dim) hitungan histogram, baris sesuai index
+"""
+import json
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cv2
+
+from . import lbp
+from .config import Config
+from .gallery import Gallery, release_pages
+from .preprocess import load_stored_face
+from .storage import atomic_path
+
+_FORMAT = 3       # 3: equalize crop tersimpan mengikuti normalization.json
+_CHUNK  = 256     # foto per batch decode/histogram
+
+
+def usable(config: Config) -> bool:
+    """Cache butuh crop berukuran tetap (semua sel histogram sama besar)."""
+    return config.face_size is not None
+
+
+def _cell_pixels(face_size: tuple[int, int]) -> int:
+    width, height = face_size
+    return ((width - 2 * lbp.RADIUS) // lbp.GRID_X) * ((height - 2 * lbp.RADIUS) // lbp.GRID_Y)
+
+
+def _params(config: Config) -> dict:
+    cell = _cell_pixels(config.face_size)
+    return {
+        "format": _FORMAT,
+        "radius": lbp.RADIUS, "neighbors": lbp.NEIGHBORS,
+        "grid_x": lbp.GRID_X, "grid_y": lbp.GRID_Y,
+        "face_size": list(config.face_size),
+        "equalize_hist": bool(config.equalize_hist),
+        "cell_pixels": cell,
+        "dtype": "uint8" if cell <= 255 else "uint16",
+    }
+
+
+def _load_index(config: Config, params: dict):
+    """(index, rows memmap) dari cache yang ada, atau (None, None) jika tidak cocok/rusak."""
+    index_path = os.path.join(config.cache_dir, "index.json")
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if index.get("params") != params:
+            return None, None
+        rows = np.load(os.path.join(config.cache_dir, index["file"]), mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None, None
+    if len(rows) != len(index["entries"]):
+        return None, None
+    return index, rows
+
+
+def _compute(job: tuple) -> tuple[list[int], np.ndarray | None]:
+    """
+    Worker: decode + normalisasi + histogram LBPH (via OpenCV) untuk sejumlah file.
+
+    Returns:
+        (posisi file yang terbaca, hitungan histogram untuk file tersebut)
+    """
+    paths, face_size, equalize, cell, dtype = job
+    faces, ok, settings = [], [], {}
+    for i, img_path in enumerate(paths):
+        face = load_stored_face(img_path, face_size, equalize, settings)
+        if face is not None:
+            faces.append(face)
+            ok.append(i)
+    if not faces:
+        return ok, None
+    recognizer = cv2.face.LBPHFaceRecognizer_create(
+        lbp.RADIUS, lbp.NEIGHBORS, lbp.GRID_X, lbp.GRID_Y)
+    recognizer.train(faces, np.zeros(len(faces), dtype=np.int32))
+    hists = np.vstack([h.reshape(1, -1) for h in recognizer.getHistograms()])
+    return ok, np.rint(hists * cell).astype(dtype)
+
+
+def _compute_all(jobs: list[tuple], workers: int | None):
+    """
+    Hasil _compute() per job, berurutan, dihasilkan satu per satu.
+
+    Dengan beberapa proses, paling banyak 2 job per worker yang berjalan atau
+    menunggu diambil, jadi memori tetap beberapa blok berapa pun jumlah foto.
+    """
+    max_workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if max_workers <= 1:
+        yield from map(_compute, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = deque()
+        for job in jobs:
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+            pending.append(pool.submit(_compute, job))
+        while pending:
+            yield pending.popleft().result()
+
+
+def build_gallery(
+    items: list[tuple[str, int]],
+    config: Config,
+    chunk_size: int | None = None,
+    workers: int | None = 1,
+) -> tuple[Gallery, dict]:
+    """
+    Gallery untuk `items` (path, user_id) dari cache; foto baru/berubah
+    dihitung lalu cache ditulis ulang secara atomik. Entri untuk file yang
+    sudah tidak ada dibuang.
+
+    Args:
+        items     : (path, user_id) dalam urutan baris gallery.
+        config    : Path dan setting; config.face_size harus diset.
+        chunk_size: Foto per batch decode (default 256).
+        workers   : Proses paralel untuk menghitung foto baru (None = jumlah CPU).
+
+    Returns:
+        (gallery, {"cached": int, "decoded": int})
+    """
+    if not items:
+        return Gallery(np.zeros((0, 0), dtype=np.float32), []), {"cached": 0, "decoded": 0}
+    params = _params(config)
+    index, old_rows = _load_index(config, params)
+    old = {}
+    if index is not None:
+        old = {rel: (row, mtime, size, valid)
+               for row, (rel, mtime, size, valid) in enumerate(index["entries"])}
+
+    entries, sources, misses = [], [], []
+    for i, (img_path, _) in enumerate(items):
+        rel = os.path.relpath(img_path, config.dataset_dir)
+        try:
+            st = os.stat(img_path)
+            key = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            key = (None, None)
+        hit = old.get(rel)
+        if hit is not None and hit[3] and key == (hit[1], hit[2]):
+            sources.append(hit[0])
+        else:
+            sources.append(None)
+            misses.append(i)
+        entries.append([rel, key[0], key[1], True])
+
+    dim = (1 << lbp.NEIGHBORS) * lbp.GRID_X * lbp.GRID_Y
+    if index is not None and not misses and sources == list(range(len(old_rows))):
+        rows = old_rows   # tidak ada yang berubah: pakai file lama apa adanya
+    else:
+        os.makedirs(config.cache_dir, exist_ok=True)
+        name = f"hist-{uuid.uuid4().hex[:12]}.npy"
+        path = os.path.join(config.cache_dir, name)
+        with atomic_path(path) as tmp:
+            rows = np.lib.format.open_memmap(tmp, mode="w+", dtype=params["dtype"],
+                                             shape=(len(items), dim))
+            hits = [(i, src) for i, src in enumerate(sources) if src is not None]
+            for start in range(0, len(hits), _CHUNK):
+                block = hits[start:start + _CHUNK]
+                rows[[i for i, _ in block]] = old_rows[[src for _, src in block]]
+                release_pages(rows)
+                release_pages(old_rows)
+
+            step = chunk_size or _CHUNK
+            jobs = [
+                ([items[i][0] for i in misses[s:s + step]], tuple(config.face_size),
+                 config.equalize_hist, params["cell_pixels"], params["dtype"])
+                for s in range(0, len(misses), step)
+            ]
+            # Setiap blok langsung ditulis ke memmap begitu selesai dihitung
+            for s, (ok, counts) in zip(range(0, len(misses), step), _compute_all(jobs, workers)):
+                chunk = misses[s:s + step]
+                for pos in set(range(len(chunk))) - set(ok):
+                    entries[chunk[pos]][3] = False   # tidak terbaca: dicoba lagi lain kali
+                if counts is not None:
+                    rows[[chunk[pos] for pos in ok]] = counts
+                    release_pages(rows)
+            rows.flush()
+            del rows
+        with atomic_path(os.path.join(config.cache_dir, "index.json")) as tmp:
+            with open(tmp, "w") as f:
+                json.dump({"params": params, "file": name, "entries": entries}, f)
+        del old_rows
+        # Hapus semua array lama, termasuk milik cache dengan parameter lain
+        # yang tidak dimuat _load_index()
+        for fname in os.listdir(config.cache_dir):
+            if fname != name and fname.startswith("hist-") and fname.endswith(".npy"):
+                try:
+                    os.remove(os.path.join(config.cache_dir, fname))
+                except OSError:
+                    pass
+        rows = np.load(path, mmap_mode="r")
+
+    valid = np.array([entry[3] for entry in entries], dtype=bool)
+    labels = np.array([user_id for _, user_id in items], dtype=np.int32)
+    if not valid.all():
+        rows, labels = rows[valid], labels[valid]
+    gallery = Gallery(rows, labels, scale=1.0 / params["cell_pixels"])
+    return gallery, {"cached": len(items) - len(misses), "decoded": len(misses)}
+
+
+def clear(config: Config | None = None) -> None:
+    """Hapus seluruh cache histogram."""
+    config = config or Config()
+    if not os.path.isdir(config.cache_dir):
+        return
+    for fname in os.listdir(config.cache_dir):
+        if fname == "index.json" or (fname.startswith("hist-") and fname.endswith(".npy")):
+            os.remove(os.path.join(config.cache_dir, fname))
@@ -0,0 +1,140 @@
+"""
+facerecog/compact.py
+Pemangkasan gallery: kurangi foto redundan per user di dataset/.
+
+Per user, semua sampel diubah menjadi histogram LBP lalu dipilih sejumlah
+representatif dengan k-center greedy (farthest-point) memakai jarak chi-square
+yang sama dengan LBPH. Setiap sampel lain berada dalam cluster representatif
+terdekatnya, jadi variasi wajah tetap terwakili sementara sampel yang
+nyaris sama dibuang. User diproses paralel di proses terpisah.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import labels as lbl
+from . import lbp
+from . import trainer
+from .config import Config
+from .preprocess import load_stored_face
+
+MAX_PER_USER = 30   # batas default sampel per user
+
+
+def _select_representatives(hists: np.ndarray, k: int) -> list[int]:
+    """
+    Pilih k indeks dengan k-center greedy: mulai dari sampel terdekat ke
+    rata-rata, lalu berulang ambil sampel yang paling jauh dari semua yang
+    sudah terpilih.
+    """
+    first = int(lbp.chi_square(hists.mean(axis=0), hists).argmin())
+    chosen = [first]
+    nearest = lbp.chi_square(hists[first], hists)
+    while len(chosen) < k:
+        nxt = int(nearest.argmax())
+        if nearest[nxt] <= 0:
+            break  # sisa sampel identik dengan yang sudah terpilih
+        chosen.append(nxt)
+        nearest = np.minimum(nearest, lbp.chi_square(hists[nxt], hists))
+    return sorted(chosen)
+
+
+def _compact_user(job: tuple[str, int, bool, Config]) -> dict:
+    """Worker proses: pangkas satu folder user. Return statistik user tersebut."""
+    lid, cap, dry_run, config = job
+    person_dir = os.path.join(config.dataset_dir, lid)
+    paths, faces, settings = [], [], {}
+    for fname in sorted(os.listdir(person_dir)):
+        if not fname.endswith(".jpg"):
+            continue
+        face = load_stored_face(os.path.join(person_dir, fname),
+                                config.face_size, config.equalize_hist, settings)
+        if face is not None:
+            paths.append(os.path.join(person_dir, fname))
+            faces.append(face)
+
+    bytes_before = sum(os.path.getsize(p) for p in paths)
+    stats = {"id": int(lid), "samples_before": len(paths), "samples_after": len(paths),
+             "bytes_before": bytes_before, "bytes_after": bytes_before}
+    if len(paths) <= cap:
+        return stats
+
+    if len({f.shape for f in faces}) == 1:
+        hists = lbp.spatial_histogram(np.stack(faces))
+    else:
+        hists = np.vstack([lbp.spatial_histogram(f) for f in faces])
+    keep = set(_select_representatives(hists, cap))
+
+    removed = [p for i, p in enumerate(paths) if i not in keep]
+    removed_bytes = sum(os.path.getsize(p) for p in removed)
+    if not dry_run:
+        for p in removed:
+            os.remove(p)
+    stats["samples_after"] = len(paths) - len(removed)
+    stats["bytes_after"] = bytes_before - removed_bytes
+    return stats
+
+
+def compact(
+    max_per_user: int = MAX_PER_USER,
+    caps: dict[str, int] | None = None,
+    workers: int | None = None,
+    retrain: bool = True,
+    dry_run: bool = False,
+    config: Config | None = None,
+) -> dict:
+    """
+    Pangkas dataset setiap user ke paling banyak `max_per_user` sampel
+    representatif, lalu latih ulang model dengan format yang sedang aktif.
+
+    Args:
+        max_per_user: Batas sampel per user.
+        caps        : Batas khusus per nama user (case-insensitive), menimpa max_per_user.
+        workers     : Jumlah proses paralel (default: jumlah CPU).
+        retrain     : Latih ulang model setelah pemangkasan (hanya jika ada yang dihapus).
+        dry_run     : Hanya hitung; tidak ada file yang dihapus.
+        config      : Path dan setting (None = Config() di direktori kerja).
+
+    Returns:
+        dict: {
+            "users": [{"id", "name", "samples_before", "samples_after",
+                       "bytes_before", "bytes_after"}, ...],
+            "samples_removed": int, "bytes_before": int, "bytes_after": int,
+            "train": dict | None
+        }
+
+    Raises:
+        ValueError: Jika batas < 1.
+    """
+    caps = {name.lower(): cap for name, cap in (caps or {}).items()}
+    if max_per_user < 1 or any(cap < 1 for cap in caps.values()):
+        raise ValueError("Batas sampel per user harus >= 1.")
+
+    config = config or Config()
+    labels = lbl.load(config)
+    jobs = [
+        (lid, caps.get(name.lower(), max_per_user), dry_run, config)
+        for lid, name in sorted(labels.items(), key=lambda x: int(x[0]))
+        if os.path.isdir(os.path.join(config.dataset_dir, lid))
+    ]
+
+    users = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count() or 1)) as pool:
+            for stats in pool.map(_compact_user, jobs):
+                stats["name"] = labels[str(stats["id"])]
+                users.append(stats)
+
+    samples_removed = sum(u["samples_before"] - u["samples_after"] for u in users)
+    train_info = None
+    if retrain and samples_removed and not dry_run:
+        train_info = trainer.train(**trainer.current_settings(config), config=config)
+
+    return {
+        "users": users,
+        "samples_removed": samples_removed,
+        "bytes_before": sum(u["bytes_before"] for u in users),
+        "bytes_after": sum(u["bytes_after"] for u in users),
+        "train": train_info,
+    }
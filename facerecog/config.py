@@ -2,29 +2,106 @@
 facerecog/config.py
 All paths and constants used throughout the module.
 
-Paths are resolved relative to the caller's working directory (os.getcwd()),
-so dataset/, trainer/, and labels.json are always created inside the user's
-project folder — not inside the facerecog package itself.
+Paths live in a Config object instead of being captured at import time.
+By default they are resolved relative to the caller's working directory
+(os.getcwd()) when the Config is created, so dataset/, trainer/, and
+labels.json end up inside the user's project folder — not inside the
+facerecog package itself. Several Config objects with different base_dir
+values can be used side by side in one process.
+
+Nothing is created on import: directories are made on first write, and
+OpenCV is only imported when the cascade path is actually needed.
 """
 import os
-import cv2
-
-# ─── Base Paths ───────────────────────────────────────────────────────────────
-# Use the caller's working directory so the module is portable.
-BASE_DIR    = os.getcwd()
-DATASET_DIR = os.path.join(BASE_DIR, "dataset")
-TRAINER_DIR = os.path.join(BASE_DIR, "trainer")
-LABELS_FILE = os.path.join(BASE_DIR, "labels.json")
-MODEL_PATH  = os.path.join(TRAINER_DIR, "trainer.yml")
-
-# ─── OpenCV Paths ─────────────────────────────────────────────────────────────
-CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+from dataclasses import dataclass, field
 
 # ─── Constants ────────────────────────────────────────────────────────────────
 MAX_PHOTOS           = 40    # photos per camera registration session
 CONFIDENCE_THRESHOLD = 75    # LBPH confidence < this value = recognized
 IMG_EXTS             = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 
-# ─── Ensure required directories exist ───────────────────────────────────────
-os.makedirs(DATASET_DIR, exist_ok=True)
-os.makedirs(TRAINER_DIR, exist_ok=True)
+# ─── Normalisasi Wajah ────────────────────────────────────────────────────────
+# Diterapkan sama persis saat registrasi, training, dan deteksi.
+FACE_SIZE     = (100, 100)   # (lebar, tinggi) crop wajah; None = ukuran asli
+EQUALIZE_HIST = False        # histogram equalization setelah resize
+
+# ─── Filter Registrasi ────────────────────────────────────────────────────────
+DEDUP_MIN_DISTANCE = 6       # jarak Hamming dHash minimum ke crop yang sudah ada; 0 = nonaktif
+MIN_SHARPNESS      = 0.0     # varians Laplacian minimum (tolak crop blur); 0 = nonaktif
+
+
+def default_cascade_path() -> str:
+    """Haar cascade bawaan OpenCV (cv2 baru di-import di sini)."""
+    import cv2
+    return cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+
+
+@dataclass
+class Config:
+    """
+    Paths and settings for one data root.
+
+    Only base_dir is usually needed; every other path is derived from it
+    unless given explicitly.
+
+        cfg = Config(base_dir="/srv/faces/site-a", confidence_threshold=70)
+        fr  = FaceRecog(config=cfg)
+    """
+    base_dir: str = field(default_factory=os.getcwd)
+    dataset_dir: str | None = None
+    trainer_dir: str | None = None
+    labels_file: str | None = None
+    model_path: str | None = None        # trainer.yml
+    model_bin_path: str | None = None    # trainer.lbph — format biner ringkas (opsional)
+    shards_dir: str | None = None        # model ter-shard (opsional)
+    cache_dir: str | None = None         # cache histogram training
+    cascade_path: str | None = None      # None = cascade bawaan OpenCV, di-resolve saat dipakai
+
+    max_photos: int = MAX_PHOTOS
+    confidence_threshold: float = CONFIDENCE_THRESHOLD
+    face_size: tuple[int, int] | None = FACE_SIZE
+    equalize_hist: bool = EQUALIZE_HIST
+    dedup_min_distance: int = DEDUP_MIN_DISTANCE
+    min_sharpness: float = MIN_SHARPNESS
+
+    def __post_init__(self):
+        self.base_dir       = os.path.abspath(self.base_dir)
+        self.dataset_dir    = self.dataset_dir or os.path.join(self.base_dir, "dataset")
+        self.trainer_dir    = self.trainer_dir or os.path.join(self.base_dir, "trainer")
+        self.labels_file    = self.labels_file or os.path.join(self.base_dir, "labels.json")
+        self.model_path     = self.model_path or os.path.join(self.trainer_dir, "trainer.yml")
+        self.model_bin_path = self.model_bin_path or os.path.join(self.trainer_dir, "trainer.lbph")
+        self.shards_dir     = self.shards_dir or os.path.join(self.trainer_dir, "shards")
+        self.cache_dir      = self.cache_dir or os.path.join(self.trainer_dir, "cache")
+
+    @property
+    def shards_manifest(self) -> str:
+        return os.path.join(self.shards_dir, "manifest.json")
+
+    def cascade(self) -> str:
+        """Path Haar cascade yang dipakai."""
+        return self.cascade_path or default_cascade_path()
+
+
+# ─── Backward-compatible module constants ─────────────────────────────────────
+# BASE_DIR, DATASET_DIR, ... are resolved from the current working directory
+# when accessed (not at import time), so importing this module has no side effects.
+_PATH_ATTRS = {
+    "BASE_DIR": "base_dir",
+    "DATASET_DIR": "dataset_dir",
+    "TRAINER_DIR": "trainer_dir",
+    "LABELS_FILE": "labels_file",
+    "MODEL_PATH": "model_path",
+    "MODEL_BIN_PATH": "model_bin_path",
+    "SHARDS_DIR": "shards_dir",
+    "SHARDS_MANIFEST": "shards_manifest",
+    "CACHE_DIR": "cache_dir",
+}
+
+
+def __getattr__(name: str):
+    if name in _PATH_ATTRS:
+        return getattr(Config(), _PATH_ATTRS[name])
+    if name == "CASCADE_PATH":
+        return default_cascade_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
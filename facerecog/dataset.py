@@ -4,22 +4,34 @@ Registrasi wajah — dari kamera real-time atau dari file/folder gambar.
 """
 import os
 import shutil
+import numpy as np
 import cv2
 
-from .config import (
-    DATASET_DIR, CASCADE_PATH, MAX_PHOTOS, IMG_EXTS
-)
+from .config import Config, IMG_EXTS, DEDUP_MIN_DISTANCE, MIN_SHARPNESS
 from . import labels as lbl
+from .preprocess import (
+    normalize_face, normalize_stored_face, load_stored_face,
+    stored_normalization, save_normalization,
+)
+from .storage import atomic_path, write_exclusive
 
 
 # ─── Internal Helper ──────────────────────────────────────────────────────────
 
-def _prepare_user(name: str, overwrite: bool = False, append: bool = True) -> tuple[int, str, dict]:
+def _prepare_user(
+    name: str,
+    overwrite: bool = False,
+    append: bool = True,
+    config: Config | None = None,
+) -> tuple[int, str, bool]:
     """
     Siapkan: cek nama, tentukan ID, buat folder dataset.
 
+    Label user baru langsung disimpan (dipesan) di bawah lock, sehingga proses
+    lain yang mendaftar bersamaan tidak mendapat ID yang sama.
+
     Returns:
-        (user_id, person_dir, labels_dict)
+        (user_id, person_dir, created) — created=True jika user baru.
 
     Raises:
         ValueError: jika nama kosong atau overwrite/append ditolak.
@@ -27,30 +39,135 @@ def _prepare_user(name: str, overwrite: bool = False, append: bool = True) -> tu
     if not name:
         raise ValueError("Nama tidak boleh kosong.")
 
-    labels  = lbl.load()
-    lid_str, user_id = lbl.find_by_name(labels, name)
-
-    if user_id is not None:
-        person_dir = os.path.join(DATASET_DIR, lid_str)
-        if not append and not overwrite:
-            raise ValueError(f"'{name}' sudah terdaftar (ID {user_id}). Set overwrite=True atau append=True.")
-        if overwrite:
-            if os.path.exists(person_dir):
-                shutil.rmtree(person_dir)
-        # append: biarkan folder apa adanya
-    else:
-        user_id = lbl.next_id(labels)
+    config = config or Config()
+    with lbl.locked(config) as labels:
+        lid_str, user_id = lbl.find_by_name(labels, name)
+        created = user_id is None
+
+        if not created:
+            person_dir = os.path.join(config.dataset_dir, lid_str)
+            if not append and not overwrite:
+                raise ValueError(f"'{name}' sudah terdaftar (ID {user_id}). Set overwrite=True atau append=True.")
+            if overwrite:
+                if os.path.exists(person_dir):
+                    shutil.rmtree(person_dir)
+            # append: biarkan folder apa adanya
+        else:
+            user_id = lbl.next_id(labels)
+            labels[str(user_id)] = name
+
+        person_dir = os.path.join(config.dataset_dir, str(user_id))
+        os.makedirs(person_dir, exist_ok=True)
+    return user_id, person_dir, created
+
+
+def _release_user(user_id: int, name: str, person_dir: str, config: Config | None = None) -> None:
+    """Batalkan pesanan label user baru jika tidak ada foto yang tersimpan."""
+    with lbl.locked(config) as labels:
         lid_str = str(user_id)
-        labels[lid_str] = name
+        if labels.get(lid_str) == name and os.path.isdir(person_dir) and not os.listdir(person_dir):
+            os.rmdir(person_dir)
+            del labels[lid_str]
+
+
+def _next_index(person_dir: str) -> int:
+    """Nomor file .jpg berikutnya (nomor terbesar yang ada + 1)."""
+    numbers = [
+        int(stem) for stem, ext in map(os.path.splitext, os.listdir(person_dir))
+        if ext == ".jpg" and stem.isdigit()
+    ]
+    return max(numbers, default=0) + 1
+
+
+def _save_crop(person_dir: str, face, index: int) -> int:
+    """
+    Simpan crop wajah (sudah dinormalisasi) sebagai `<n>.jpg` tanpa menimpa
+    file milik proses lain.
+
+    Returns:
+        Nomor n yang dipakai (bisa > index jika nama sudah diambil).
+    """
+    ok, buf = cv2.imencode(".jpg", face)
+    if not ok:
+        raise RuntimeError("Gagal meng-encode gambar wajah.")
+    return write_exclusive(person_dir, buf.tobytes(), index)
 
-    person_dir = os.path.join(DATASET_DIR, str(user_id))
-    os.makedirs(person_dir, exist_ok=True)
-    return user_id, person_dir, labels
 
+def _dhash(face) -> int:
+    """Perceptual difference hash 64-bit dari crop grayscale."""
+    small = cv2.resize(face, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
 
-def _count_existing(person_dir: str) -> int:
-    """Hitung jumlah file .jpg yang sudah ada di folder."""
-    return sum(1 for f in os.listdir(person_dir) if f.endswith(".jpg"))
+
+class _CropFilter:
+    """
+    Filter registrasi: tolak crop yang hampir sama dengan crop yang sudah
+    diterima (sesi ini atau dataset user), dan crop yang terlalu blur.
+    """
+
+    def __init__(
+        self,
+        min_distance: int = DEDUP_MIN_DISTANCE,
+        min_sharpness: float = MIN_SHARPNESS,
+        config: Config | None = None,
+    ):
+        self.min_distance  = min_distance
+        self.min_sharpness = min_sharpness
+        self.config        = config or Config()
+        self.hashes: list[int] = []
+        self.duplicates    = 0   # crop ditolak karena hampir sama
+        self.blurry        = 0   # crop ditolak karena terlalu blur
+
+    def seed(self, person_dir: str) -> None:
+        """Masukkan crop yang sudah ada di dataset user sebagai pembanding."""
+        if self.min_distance <= 0:
+            return
+        settings = {}
+        for fname in os.listdir(person_dir):
+            if fname.endswith(".jpg"):
+                face = load_stored_face(os.path.join(person_dir, fname), self.config.face_size,
+                                        self.config.equalize_hist, settings)
+                if face is not None:
+                    self.hashes.append(_dhash(face))
+
+    def accept(self, face) -> bool:
+        """True jika crop cukup tajam dan cukup berbeda; crop yang diterima dicatat."""
+        if self.min_sharpness > 0 and cv2.Laplacian(face, cv2.CV_64F).var() < self.min_sharpness:
+            self.blurry += 1
+            return False
+        if self.min_distance <= 0:
+            return True
+        h = _dhash(face)
+        if any((h ^ other).bit_count() < self.min_distance for other in self.hashes):
+            self.duplicates += 1
+            return False
+        self.hashes.append(h)
+        return True
+
+
+def _storage_settings(person_dir: str, config: Config) -> dict:
+    """
+    Setting normalisasi untuk crop baru di `person_dir`. Folder kosong memakai
+    setting config; folder yang sudah berisi crop mempertahankan status
+    equalize yang tercatat agar satu folder tidak pernah campuran (langkah yang
+    kurang diterapkan saat dibaca, atau lewat normalize_dataset()).
+    """
+    if not any(f.endswith(".jpg") for f in os.listdir(person_dir)):
+        return {"face_size": config.face_size, "equalize_hist": config.equalize_hist}
+    stored = stored_normalization(person_dir)
+    same_size = stored["face_size"] is not None and tuple(stored["face_size"]) == tuple(config.face_size or ())
+    return {"face_size": config.face_size if same_size else None,
+            "equalize_hist": stored["equalize_hist"]}
+
+
+def _crop_filter(min_distance: int | None, min_sharpness: float | None, config: Config) -> _CropFilter:
+    """_CropFilter dengan nilai default dari config untuk argumen None."""
+    return _CropFilter(
+        config.dedup_min_distance if min_distance is None else min_distance,
+        config.min_sharpness if min_sharpness is None else min_sharpness,
+        config,
+    )
 
 
 # ─── Public API ───────────────────────────────────────────────────────────────
@@ -59,20 +176,30 @@ def register_from_camera(
     name: str,
     overwrite: bool = False,
     append: bool = True,
-    max_photos: int = MAX_PHOTOS,
+    max_photos: int | None = None,
     camera_index: int = 0,
     app_name: str = "Face Recognition",
+    min_distance: int | None = None,
+    min_sharpness: float | None = None,
+    config: Config | None = None,
 ) -> int:
     """
     Capture face photos from camera and save as training data.
 
+    Near-duplicate frames (dHash distance < min_distance to any photo already
+    accepted for this user) and blurry frames are skipped, so the saved
+    photos are diverse instead of 40 copies of the same second of video.
+
     Args:
-        name        : Person's name to register.
-        overwrite   : Delete old dataset before saving.
-        append      : Add to existing dataset.
-        max_photos  : Number of photos to capture.
-        camera_index: Camera index (default 0).
-        app_name    : Application name shown in window title.
+        name         : Person's name to register.
+        overwrite    : Delete old dataset before saving.
+        append       : Add to existing dataset.
+        max_photos   : Number of photos to capture (None = config.max_photos).
+        camera_index : Camera index (default 0).
+        app_name     : Application name shown in window title.
+        min_distance : Minimum dHash Hamming distance (0 = keep duplicates).
+        min_sharpness: Minimum Laplacian variance (0 = no blur check).
+        config       : Paths and settings (None = Config() in the working directory).
 
     Returns:
         Jumlah foto yang berhasil disimpan.
@@ -81,14 +208,23 @@ def register_from_camera(
         ValueError  : Jika nama kosong atau konflik overwrite/append.
         RuntimeError: Jika kamera tidak bisa dibuka.
     """
-    user_id, person_dir, labels = _prepare_user(name, overwrite=overwrite, append=append)
+    config     = config or Config()
+    max_photos = config.max_photos if max_photos is None else max_photos
+    user_id, person_dir, created = _prepare_user(name, overwrite=overwrite, append=append, config=config)
 
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    face_cascade = cv2.CascadeClassifier(config.cascade())
     cap = cv2.VideoCapture(camera_index)
     if not cap.isOpened():
+        if created:
+            _release_user(user_id, name, person_dir, config)
         raise RuntimeError(f"Gagal membuka kamera (index {camera_index}).")
 
-    count   = _count_existing(person_dir)
+    crop_filter = _crop_filter(min_distance, min_sharpness, config)
+    if not overwrite:
+        crop_filter.seed(person_dir)
+    stored = _storage_settings(person_dir, config)
+
+    count   = _next_index(person_dir)
     saved   = 0
     WIN     = f"Register Face — {app_name}"
     cv2.namedWindow(WIN, cv2.WINDOW_NORMAL)
@@ -109,9 +245,13 @@ def register_from_camera(
         for (x, y, w, h) in faces:
             if saved >= max_photos:
                 break
-            count += 1
+            face = normalize_face(gray[y:y + h, x:x + w], config.face_size, stored["equalize_hist"])
+            if not crop_filter.accept(normalize_stored_face(
+                    face, None, config.equalize_hist, stored["equalize_hist"])):
+                cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 160, 255), 1)
+                continue
+            count  = _save_crop(person_dir, face, count) + 1
             saved += 1
-            cv2.imwrite(os.path.join(person_dir, f"{count}.jpg"), gray[y:y + h, x:x + w])
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 220, 0), 2)
             cv2.putText(frame, f"{saved}/{max_photos}", (x, y - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.65, (0, 220, 0), 2)
@@ -131,8 +271,10 @@ def register_from_camera(
     cap.release()
     cv2.destroyAllWindows()
 
-    if saved > 0:
-        lbl.save(labels)
+    if saved:
+        save_normalization(person_dir, stored["face_size"], stored["equalize_hist"])
+    elif created:
+        _release_user(user_id, name, person_dir, config)
 
     return saved
 
@@ -142,28 +284,37 @@ def register_from_image(
     src: str,
     overwrite: bool = False,
     append: bool = True,
+    min_distance: int | None = None,
+    min_sharpness: float | None = None,
+    config: Config | None = None,
 ) -> int:
     """
     Daftarkan wajah dari file gambar tunggal atau folder berisi banyak gambar.
 
+    Wajah yang hampir identik dengan foto yang sudah diterima, atau terlalu
+    blur, dilewati.
+
     Args:
-        name     : Nama orang yang didaftarkan.
-        src      : Path ke file gambar atau folder.
-        overwrite: Hapus dataset lama sebelum menyimpan.
-        append   : Tambah ke dataset yang sudah ada.
+        name         : Nama orang yang didaftarkan.
+        src          : Path ke file gambar atau folder.
+        overwrite    : Hapus dataset lama sebelum menyimpan.
+        append       : Tambah ke dataset yang sudah ada.
+        min_distance : Jarak Hamming dHash minimum (0 = simpan duplikat).
+        min_sharpness: Varians Laplacian minimum (0 = tanpa cek blur).
+        config       : Path dan setting (None = Config() di direktori kerja).
 
     Returns:
         Jumlah foto wajah yang berhasil disimpan.
 
     Raises:
         ValueError  : Jika nama kosong, path tidak ada, atau tidak ada gambar.
-        RuntimeError: Jika tidak ada wajah berhasil disimpan.
+        RuntimeError: Jika tidak ada wajah berhasil disimpan (pesan berbeda jika
+                      wajah terdeteksi tetapi semuanya ditolak sebagai
+                      duplikat/blur).
     """
     if not os.path.exists(src):
         raise ValueError(f"Path tidak ditemukan: {src}")
 
-    user_id, person_dir, labels = _prepare_user(name, overwrite=overwrite, append=append)
-
     # Kumpulkan file gambar
     if os.path.isfile(src):
         img_files = [src] if os.path.splitext(src)[1].lower() in IMG_EXTS else []
@@ -177,8 +328,16 @@ def register_from_image(
     if not img_files:
         raise ValueError("Tidak ada file gambar ditemukan di path yang diberikan.")
 
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
-    count = _count_existing(person_dir)
+    config = config or Config()
+    user_id, person_dir, created = _prepare_user(name, overwrite=overwrite, append=append, config=config)
+
+    crop_filter = _crop_filter(min_distance, min_sharpness, config)
+    if not overwrite:
+        crop_filter.seed(person_dir)
+    stored = _storage_settings(person_dir, config)
+
+    face_cascade = cv2.CascadeClassifier(config.cascade())
+    count = _next_index(person_dir)
     saved = 0
     skipped = 0
 
@@ -198,16 +357,88 @@ def register_from_image(
             continue
 
         for (x, y, w, h) in faces:
-            count += 1
+            face = normalize_face(gray[y:y + h, x:x + w], config.face_size, stored["equalize_hist"])
+            if not crop_filter.accept(normalize_stored_face(
+                    face, None, config.equalize_hist, stored["equalize_hist"])):
+                continue
+            count  = _save_crop(person_dir, face, count) + 1
             saved += 1
-            cv2.imwrite(os.path.join(person_dir, f"{count}.jpg"), gray[y:y + h, x:x + w])
 
     if saved == 0:
         # Bersihkan label baru jika tidak ada yang tersimpan
-        if str(user_id) in labels and not os.listdir(person_dir):
-            del labels[str(user_id)]
-        lbl.save(labels)
+        if created:
+            _release_user(user_id, name, person_dir, config)
+        rejected = crop_filter.duplicates + crop_filter.blurry
+        if rejected:
+            raise RuntimeError(
+                f"Semua {rejected} wajah yang terdeteksi ditolak filter: "
+                f"{crop_filter.duplicates} hampir sama dengan foto yang sudah ada, "
+                f"{crop_filter.blurry} terlalu blur. Set min_distance=0 / min_sharpness=0 "
+                f"untuk tetap menyimpannya."
+            )
         raise RuntimeError("Tidak ada wajah berhasil disimpan dari gambar yang diberikan.")
 
-    lbl.save(labels)
+    save_normalization(person_dir, stored["face_size"], stored["equalize_hist"])
     return saved
+
+
+def normalize_dataset(
+    size: tuple[int, int] | None = None,
+    equalize: bool | None = None,
+    config: Config | None = None,
+) -> dict:
+    """
+    Migrasi: normalisasi semua crop di dataset/ yang sudah ada (hasil registrasi
+    lama berukuran bebas) menjadi ukuran seragam. File ditulis ulang secara atomik.
+
+    Hanya langkah yang belum diterapkan yang dijalankan: resize untuk crop yang
+    belum berukuran `size`, dan equalization jika folder user belum tercatat
+    ter-equalize di normalization.json. Setelahnya catatan diperbarui, jadi
+    menjalankan migrasi berulang kali tidak meng-equalize/meng-encode ulang.
+    Equalization yang sudah diterapkan tidak bisa dibatalkan.
+
+    Args:
+        size    : (lebar, tinggi) tujuan (None = config.face_size).
+        equalize: Terapkan juga histogram equalization (None = config.equalize_hist).
+        config  : Path dan setting (None = Config() di direktori kerja).
+
+    Returns:
+        dict: {"files": int, "normalized": int, "bytes_before": int, "bytes_after": int}
+    """
+    config   = config or Config()
+    size     = config.face_size if size is None else size
+    equalize = config.equalize_hist if equalize is None else equalize
+    files = normalized = bytes_before = bytes_after = 0
+    for lid in sorted(lbl.load(config), key=int):
+        person_dir = os.path.join(config.dataset_dir, lid)
+        if not os.path.isdir(person_dir):
+            continue
+        stored = stored_normalization(person_dir)
+        add_equalize = equalize and not stored["equalize_hist"]
+        user_files = 0
+        for fname in sorted(os.listdir(person_dir)):
+            if not fname.endswith(".jpg"):
+                continue
+            img_path = os.path.join(person_dir, fname)
+            size_before = os.path.getsize(img_path)
+            files += 1
+            user_files += 1
+            bytes_before += size_before
+            img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+            resize = size is not None and img is not None and (img.shape[1], img.shape[0]) != tuple(size)
+            if img is None or not (resize or add_equalize):
+                bytes_after += size_before
+                continue
+            with atomic_path(img_path) as tmp:
+                cv2.imwrite(tmp, normalize_stored_face(img, size, equalize, stored["equalize_hist"]))
+            normalized += 1
+            bytes_after += os.path.getsize(img_path)
+        if user_files:
+            save_normalization(person_dir, size if size is not None else stored["face_size"],
+                               stored["equalize_hist"] or equalize)
+    return {
+        "files": files,
+        "normalized": normalized,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+    }
@@ -3,50 +3,196 @@ facerecog/detector.py
 Deteksi & pengenalan wajah — dari kamera real-time atau dari file gambar.
 """
 import os
-from dataclasses import dataclass, field
+import threading
+import time
 from typing import Optional
+import numpy as np
 import cv2
 
-from .config import CASCADE_PATH, MODEL_PATH, CONFIDENCE_THRESHOLD
+from .config import Config
 from . import labels as lbl
+from .gallery import Gallery, ShardedGallery
+from .preprocess import normalize_faces
+from .results import DetectionResult, FaceResult
+from .events import EventLog
 
 
-# ─── Result Types ─────────────────────────────────────────────────────────────
+# ─── Internal Helpers ─────────────────────────────────────────────────────────
+
+def _load_model(config: Config | None = None):
+    """
+    Muat model aktif, urut prioritas: model ter-shard, trainer.lbph (biner,
+    di-memory-map), lalu trainer.yml. trainer.yml dibungkus menjadi Gallery
+    (hasil identik dengan LBPHFaceRecognizer.predict()), jadi semua format
+    punya predict()/predict_many() dan crop satu frame dicocokkan sebagai batch.
+    """
+    config = config or Config()
+    if os.path.exists(config.shards_manifest):
+        return ShardedGallery.load(config.shards_manifest)
+    if os.path.exists(config.model_bin_path):
+        return Gallery.load(config.model_bin_path)
+    if not os.path.exists(config.model_path):
+        raise RuntimeError("Model belum ada. Jalankan train() terlebih dahulu.")
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(config.model_path)
+    return Gallery.from_recognizer(recognizer)
+
+
+def _model_version(config: Config) -> tuple:
+    """Sidik jari file model + labels (mtime, size, inode); berubah saat di-train ulang."""
+    version = []
+    for path in (config.model_path, config.model_bin_path, config.shards_manifest, config.labels_file):
+        try:
+            st = os.stat(path)
+            version.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except FileNotFoundError:
+            version.append(None)
+    return tuple(version)
+
+
+class ModelHandle:
+    """
+    Model + labels yang dipakai sesi deteksi, bisa diganti saat berjalan.
+
+    `poll()` dipanggil di antara frame: murah (hanya os.stat tiap
+    `poll_interval` detik). Jika model/labels berubah, atau `request_reload()`
+    dipanggil dari thread lain, model baru di-parse di thread background lalu
+    ditukar sekaligus dengan labels-nya — frame tidak pernah menunggu parsing.
+    """
 
-@dataclass
-class FaceResult:
-    """Hasil deteksi satu wajah."""
-    x: int
-    y: int
-    w: int
-    h: int
-    user_id: Optional[int]       # None jika tidak dikenali
-    name: str                    # "Tidak Dikenal" jika tidak dikenali
-    confidence: float            # raw LBPH confidence (lebih rendah = lebih yakin)
-    recognized: bool             # True jika confidence < threshold
+    def __init__(self, poll_interval: Optional[float] = 2.0, config: Config | None = None):
+        """
+        Args:
+            poll_interval: Jeda (detik) antar pengecekan file model.
+                           None = hanya reload lewat request_reload()/reload().
+            config       : Path model/labels (None = Config() di direktori kerja).
+
+        Raises:
+            RuntimeError: If model not found.
+        """
+        self.poll_interval = poll_interval
+        self.config        = config or Config()
+        self._version      = _model_version(self.config)
+        self._current      = (_load_model(self.config), lbl.load(self.config))
+        self._requested    = threading.Event()
+        self._loading      = threading.Lock()
+        self._last_poll    = time.monotonic()
 
     @property
-    def score(self) -> int:
-        """Keyakinan dalam persen (0–100). Hanya bermakna jika recognized=True."""
-        return 100 - int(self.confidence)
+    def current(self) -> tuple:
+        """(recognizer, labels) yang aktif — selalu pasangan yang konsisten."""
+        return self._current
+
+    def request_reload(self) -> None:
+        """Minta reload di background pada poll() berikutnya (aman dari thread mana pun)."""
+        self._requested.set()
+
+    def reload(self) -> None:
+        """Muat ulang model + labels sekarang juga (blocking)."""
+        with self._loading:
+            self._swap(_model_version(self.config))
+
+    def poll(self) -> None:
+        """Cek perubahan model; jika ada, mulai load di background. Tidak pernah blocking."""
+        requested = self._requested.is_set()
+        now = time.monotonic()
+        if not requested:
+            if self.poll_interval is None or now - self._last_poll < self.poll_interval:
+                return
+        self._last_poll = now
+
+        version = _model_version(self.config)
+        if not requested and version == self._version:
+            return
+        if not self._loading.acquire(blocking=False):
+            return  # reload sebelumnya masih berjalan
+        self._requested.clear()
+        threading.Thread(target=self._reload_background, args=(version,), daemon=True).start()
+
+    def _reload_background(self, version: tuple) -> None:
+        try:
+            self._swap(version)
+        except (RuntimeError, ValueError, OSError, cv2.error):
+            pass  # model sedang tidak valid; tetap pakai model lama, coba lagi di poll berikutnya
+        finally:
+            self._loading.release()
+
+    def _swap(self, version: tuple) -> None:
+        recognizer, labels = _load_model(self.config), lbl.load(self.config)
+        self._current = (recognizer, labels)
+        self._version = version
+
+
+def _recognize(
+    recognizer,
+    labels: dict,
+    gray,
+    faces,
+    threshold: float,
+    config: Config | None = None,
+) -> list[FaceResult]:
+    """
+    Kenali semua wajah dalam satu frame. Crop dinormalisasi lalu diprediksi
+    sebagai satu batch jika model mendukung predict_many() (Gallery).
+    """
+    if len(faces) == 0:
+        return []
+    predictions = _predict(recognizer, [gray[y:y + h, x:x + w] for (x, y, w, h) in faces], config)
+    return _to_results(faces, predictions, labels, threshold)
 
 
-@dataclass
-class DetectionResult:
-    """Hasil deteksi satu gambar."""
-    image_path: Optional[str]
-    total_faces: int
-    faces: list[FaceResult] = field(default_factory=list)
+def _predict(recognizer, crops, config: Config | None = None) -> list[tuple[int, float]]:
+    """Normalisasi crop lalu prediksi sebagai satu batch jika model mendukung predict_many()."""
+    config = config or Config()
+    crops = normalize_faces(crops, config.face_size, config.equalize_hist)
+    if hasattr(recognizer, "predict_many"):
+        return recognizer.predict_many(crops)
+    return [recognizer.predict(crop) for crop in crops]
 
 
-# ─── Internal Helpers ─────────────────────────────────────────────────────────
+def _to_results(boxes, predictions, labels: dict, threshold: float) -> list[FaceResult]:
+    results = []
+    for (x, y, w, h), (lid, conf) in zip(boxes, predictions):
+        recognized = conf < threshold
+        results.append(FaceResult(
+            x=x, y=y, w=w, h=h,
+            user_id=lid if recognized else None,
+            name=labels.get(str(lid), "?") if recognized else "Unknown",
+            confidence=conf,
+            recognized=recognized,
+        ))
+    return results
 
-def _load_model():
-    if not os.path.exists(MODEL_PATH):
-        raise RuntimeError("Model belum ada. Jalankan train() terlebih dahulu.")
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.read(MODEL_PATH)
-    return recognizer
+
+def _gray_crops(crops):
+    """
+    Terima list crop (grayscale atau BGR/BGRA) atau array bertumpuk (N, H, W)
+    / (N, H, W, C); satu crop 2-D dianggap batch berisi satu. Satu crop
+    berwarna (H, W, 3|4) ditolak karena tidak bisa dibedakan dari tumpukan
+    grayscale: bungkus dalam list atau tambahkan sumbu batch.
+    """
+    if isinstance(crops, np.ndarray):
+        if crops.ndim == 2:
+            return crops[np.newaxis]
+        if crops.ndim == 3:
+            if crops.shape[-1] in (3, 4):
+                raise ValueError(
+                    "Array (H, W, 3|4) ambigu: untuk satu crop berwarna gunakan [crop] "
+                    "atau crop[np.newaxis]; tumpukan berwarna harus (N, H, W, C)."
+                )
+            return crops
+        if crops.ndim != 4:
+            raise ValueError("Array crop harus berbentuk (N, H, W) atau (N, H, W, C).")
+    gray = []
+    for crop in crops:
+        crop = np.asarray(crop)
+        if crop.ndim == 3:
+            code = cv2.COLOR_BGRA2GRAY if crop.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            crop = cv2.cvtColor(crop, code)
+        elif crop.ndim != 2:
+            raise ValueError("Setiap crop harus 2-D (grayscale) atau 3-D (BGR/BGRA).")
+        gray.append(crop)
+    return gray
 
 
 def _draw_result(frame, result: FaceResult):
@@ -72,24 +218,37 @@ def _wait_close(window_title: str):
 # ─── Public API ───────────────────────────────────────────────────────────────
 
 def detect_camera(
-    threshold: int = CONFIDENCE_THRESHOLD,
+    threshold: Optional[float] = None,
     camera_index: int = 0,
     app_name: str = "Face Recognition",
+    model: Optional[ModelHandle] = None,
+    config: Config | None = None,
+    events: Optional[EventLog] = None,
 ) -> None:
     """
     Detect and recognize faces in real-time from camera.
 
+    The model is hot-reloaded: when trainer.yml or labels.json changes (or
+    `model.request_reload()` is called), the new model is loaded in the
+    background and swapped in between frames.
+
     Args:
-        threshold   : LBPH confidence < threshold = recognized.
+        threshold   : LBPH confidence < threshold = recognized
+                      (None = config.confidence_threshold).
         camera_index: Camera index (default 0).
         app_name    : Application name shown in window title.
+        model       : Shared ModelHandle; a new one is created if None.
+        config      : Paths and settings (None = the model's config, or Config()).
+        events      : Optional EventLog; every recognized/unknown face is pushed
+                      to it (source "camera:<index>") without blocking the loop.
 
     Raises:
         RuntimeError: If model not found or camera cannot be opened.
     """
-    recognizer   = _load_model()
-    labels       = lbl.load()
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    config       = config or (model.config if model else Config())
+    threshold    = config.confidence_threshold if threshold is None else threshold
+    model        = model or ModelHandle(config=config)
+    face_cascade = cv2.CascadeClassifier(config.cascade())
 
     cap = cv2.VideoCapture(camera_index)
     if not cap.isOpened():
@@ -106,21 +265,18 @@ def detect_camera(
         if cv2.getWindowProperty(WIN, cv2.WND_PROP_VISIBLE) < 1:
             break
 
+        model.poll()
+        recognizer, labels = model.current
+
         gray  = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         faces = face_cascade.detectMultiScale(
             gray, scaleFactor=1.2, minNeighbors=5, minSize=(80, 80)
         )
 
-        for (x, y, w, h) in faces:
-            lid, conf = recognizer.predict(gray[y:y + h, x:x + w])
-            recognized = conf < threshold
-            result = FaceResult(
-                x=x, y=y, w=w, h=h,
-                user_id=lid if recognized else None,
-                name=labels.get(str(lid), "?") if recognized else "Unknown",
-                confidence=conf,
-                recognized=recognized,
-            )
+        results = _recognize(recognizer, labels, gray, faces, threshold, config)
+        if events is not None and results:
+            events.emit(results, source=f"camera:{camera_index}")
+        for result in results:
             _draw_result(frame, result)
 
         cv2.putText(frame, f"Registered: {len(labels)}", (10, 30),
@@ -139,18 +295,25 @@ def detect_camera(
 
 def detect_image(
     img_path: str,
-    threshold: int = CONFIDENCE_THRESHOLD,
+    threshold: Optional[float] = None,
     show: bool = True,
     app_name: str = "Face Recognition",
+    model: Optional[ModelHandle] = None,
+    config: Config | None = None,
+    events: Optional[EventLog] = None,
 ) -> DetectionResult:
     """
     Detect and recognize faces from an image file.
 
     Args:
         img_path  : Path to image file.
-        threshold : LBPH confidence < threshold = recognized.
+        threshold : LBPH confidence < threshold = recognized
+                    (None = config.confidence_threshold).
         show      : Show result window if True.
         app_name  : Application name shown in window title.
+        model     : Shared ModelHandle to reuse a loaded model; loads from disk if None.
+        config    : Paths and settings (None = the model's config, or Config()).
+        events    : Optional EventLog; each face is pushed to it (source = img_path).
 
     Returns:
         DetectionResult containing a list of FaceResult.
@@ -162,9 +325,14 @@ def detect_image(
     if not os.path.exists(img_path):
         raise ValueError(f"File tidak ditemukan: {img_path}")
 
-    recognizer   = _load_model()
-    labels       = lbl.load()
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+    config    = config or (model.config if model else Config())
+    threshold = config.confidence_threshold if threshold is None else threshold
+    if model is None:
+        recognizer, labels = _load_model(config), lbl.load(config)
+    else:
+        model.poll()
+        recognizer, labels = model.current
+    face_cascade = cv2.CascadeClassifier(config.cascade())
 
     frame = cv2.imread(img_path)
     if frame is None:
@@ -175,8 +343,6 @@ def detect_image(
         gray, scaleFactor=1.1, minNeighbors=5, minSize=(60, 60)
     )
 
-    results: list[FaceResult] = []
-
     WIN_IMG = f"Image Detection — {app_name}"
 
     if len(faces) == 0:
@@ -191,18 +357,11 @@ def detect_image(
             _wait_close(WIN_IMG)
         return DetectionResult(image_path=img_path, total_faces=0, faces=[])
 
-    for (x, y, w, h) in faces:
-        lid, conf = recognizer.predict(gray[y:y + h, x:x + w])
-        recognized = conf < threshold
-        r = FaceResult(
-            x=x, y=y, w=w, h=h,
-            user_id=lid if recognized else None,
-            name=labels.get(str(lid), "?") if recognized else "Unknown",
-            confidence=conf,
-            recognized=recognized,
-        )
-        results.append(r)
-        if show:
+    results = _recognize(recognizer, labels, gray, faces, threshold, config)
+    if events is not None:
+        events.emit(results, source=img_path)
+    if show:
+        for r in results:
             _draw_result(frame, r)
 
     if show:
@@ -220,3 +379,58 @@ def detect_image(
         total_faces=len(results),
         faces=results,
     )
+
+
+def recognize_faces(
+    crops,
+    threshold: Optional[float] = None,
+    model: Optional[ModelHandle] = None,
+    config: Config | None = None,
+    events: Optional[EventLog] = None,
+    source: Optional[str] = None,
+) -> list[FaceResult]:
+    """
+    Recognize pre-cropped faces without running face detection.
+
+    All crops are normalized exactly like detect_image() crops and predicted
+    in one predict_many() call against the same model and labels, whatever
+    the model format.
+
+    Args:
+        crops    : List of face crops (grayscale or BGR, any size), or a stacked
+                   array (N, H, W) / (N, H, W, C). A stacked uint8 grayscale
+                   array already at config.face_size is used without copying.
+                   A single colour crop must be wrapped in a list or given a
+                   batch axis.
+        threshold: LBPH confidence < threshold = recognized
+                   (None = config.confidence_threshold).
+        model    : Shared ModelHandle to reuse a loaded model; loads from disk if None.
+        config   : Paths and settings (None = the model's config, or Config()).
+        events   : Optional EventLog that receives the results.
+        source   : Source label for the events (default "crops").
+
+    Returns:
+        One FaceResult per crop, in input order. The box is the whole crop
+        (x = y = 0, w/h = crop size).
+
+    Raises:
+        ValueError  : If a crop has an unsupported shape, or a single
+                      (H, W, 3|4) colour array is passed.
+        RuntimeError: If model not found.
+    """
+    config    = config or (model.config if model else Config())
+    threshold = config.confidence_threshold if threshold is None else threshold
+    crops     = _gray_crops(crops)
+    if len(crops) == 0:
+        return []
+    if model is None:
+        recognizer, labels = _load_model(config), lbl.load(config)
+    else:
+        model.poll()
+        recognizer, labels = model.current
+
+    boxes   = [(0, 0, crop.shape[1], crop.shape[0]) for crop in crops]
+    results = _to_results(boxes, _predict(recognizer, crops, config), labels, threshold)
+    if events is not None:
+        events.emit(results, source=source or "crops")
+    return results
@@ -0,0 +1,267 @@
+"""
+facerecog/evaluate.py
+Sweep akurasi/latensi untuk parameter detector (scaleFactor, minNeighbors,
+minSize) dan CONFIDENCE_THRESHOLD.
+
+Setiap setting detector dijalankan paralel di proses terpisah. Jarak LBPH
+per sampel dihitung sekali per setting detector, lalu dipakai ulang untuk
+semua threshold — menambah threshold hampir tanpa biaya.
+
+Setting detector hanya bisa dievaluasi dengan gambar utuh (test_dir). Foto di
+dataset/ sudah berupa crop wajah, jadi tanpa test_dir deteksi dilewati dan
+hanya threshold yang di-sweep.
+"""
+import itertools
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import cv2
+
+from . import labels as lbl
+from . import detector
+from . import trainer
+from .config import Config, IMG_EXTS
+from .gallery import Gallery
+from .preprocess import normalize_stored_face, stored_normalization
+
+SCALE_FACTORS = (1.1, 1.2, 1.3)
+MIN_NEIGHBORS = (3, 5, 7)
+MIN_SIZES     = (60, 80)
+THRESHOLDS    = (50, 60, 70, 75, 80, 90)
+
+_worker_models: dict = {}   # cache model per proses worker
+
+
+# ─── Sampel Uji ───────────────────────────────────────────────────────────────
+
+def _labeled_samples(test_dir: str, labels: dict) -> list[tuple[str, int | None]]:
+    """
+    Sampel dari folder `<test_dir>/<nama>/*.jpg`. Nama yang tidak terdaftar
+    dianggap orang tak dikenal (id None): setiap penerimaan = false accept.
+    """
+    samples = []
+    for name in sorted(os.listdir(test_dir)):
+        person_dir = os.path.join(test_dir, name)
+        if not os.path.isdir(person_dir):
+            continue
+        _, user_id = lbl.find_by_name(labels, name)
+        samples.extend(
+            (os.path.join(person_dir, f), user_id)
+            for f in sorted(os.listdir(person_dir))
+            if os.path.splitext(f)[1].lower() in IMG_EXTS
+        )
+    return samples
+
+
+def _split_dataset(labels: dict, holdout: float, impostors: float, seed: int, config: Config):
+    """
+    Pisahkan data uji dari dataset/: porsi `impostors` dari user (minimal satu
+    jika ada >= 2 user dan impostors > 0) ditahan seluruhnya sebagai orang tak
+    dikenal (id None, tidak masuk gallery), dan porsi `holdout` foto tiap user
+    lainnya sebagai sampel wajah terdaftar. User tanpa foto dilewati.
+    """
+    rng = random.Random(seed)
+    users = [(lid, trainer._user_files(lid, config)) for lid in sorted(labels, key=int)]
+    users = [(lid, paths) for lid, paths in users if paths]
+    n_impostors = 0
+    if impostors > 0 and len(users) > 1:
+        n_impostors = min(max(int(round(len(users) * impostors)), 1), len(users) - 1)
+    held_out = {lid for lid, _ in rng.sample(users, n_impostors)}
+
+    train_items, samples = [], []
+    for lid, paths in users:
+        if lid in held_out:
+            samples.extend((p, None) for p in paths)
+            continue
+        rng.shuffle(paths)
+        n_test = 0
+        if len(paths) > 1:
+            n_test = min(max(int(round(len(paths) * holdout)), 1), len(paths) - 1)
+        samples.extend((p, int(lid)) for p in paths[:n_test])
+        train_items.extend((p, int(lid)) for p in paths[n_test:])
+    return train_items, samples
+
+
+# ─── Worker ───────────────────────────────────────────────────────────────────
+
+def _run_setting(job: tuple) -> list[tuple]:
+    """
+    Worker proses: jalankan satu setting detector pada seluruh sampel.
+    Setting None = sampel sudah berupa crop wajah, langsung dikenali tanpa deteksi.
+
+    Returns:
+        List (true_id, pred_id | None, distance, latency_detik) per sampel;
+        pred_id None jika tidak ada wajah terdeteksi.
+    """
+    setting, samples, model_path, config = job
+    key = (model_path, config.base_dir)
+    if key not in _worker_models:
+        _worker_models[key] = (
+            Gallery.load(model_path) if model_path else detector._load_model(config)
+        )
+    recognizer = _worker_models[key]
+    if setting is not None:
+        scale_factor, min_neighbors, min_size = setting
+        face_cascade = cv2.CascadeClassifier(config.cascade())
+
+    rows, settings = [], {}
+    for img_path, true_id in samples:
+        gray = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        start = time.perf_counter()
+        if setting is None:
+            person_dir = os.path.dirname(img_path)
+            if person_dir not in settings:
+                settings[person_dir] = stored_normalization(person_dir)
+            face = normalize_stored_face(gray, config.face_size, config.equalize_hist,
+                                         settings[person_dir]["equalize_hist"])
+            lid, conf = recognizer.predict(face)
+            rows.append((true_id, lid, conf, time.perf_counter() - start))
+            continue
+        faces = face_cascade.detectMultiScale(
+            gray, scaleFactor=scale_factor, minNeighbors=min_neighbors,
+            minSize=(min_size, min_size),
+        )
+        results = detector._recognize(recognizer, {}, gray, faces, float("inf"), config)
+        latency = time.perf_counter() - start
+        if results:
+            largest = max(results, key=lambda r: r.w * r.h)
+            rows.append((true_id, largest.user_id, largest.confidence, latency))
+        else:
+            rows.append((true_id, None, float("inf"), latency))
+    return rows
+
+
+def _rate(count, attempts) -> float | None:
+    attempts = int(attempts.sum())
+    return round(float(count.sum()) / attempts, 4) if attempts else None
+
+
+def _score(rows: list[tuple], threshold: float) -> dict:
+    """
+    Benar = wajah terdaftar diterima sebagai orang yang tepat, atau orang tak
+    dikenal ditolak. false_accept_rate dihitung dari percobaan orang tak dikenal
+    (None jika tidak ada); misidentification_rate dari percobaan wajah terdaftar
+    yang diterima sebagai orang lain.
+    """
+    true_ids = np.array([-1 if r[0] is None else r[0] for r in rows])
+    pred_ids = np.array([-2 if r[1] is None else r[1] for r in rows])
+    dist = np.array([r[2] for r in rows])
+    accepted = dist < threshold
+    impostor = true_ids == -1
+    genuine = ~impostor
+    correct = (genuine & accepted & (pred_ids == true_ids)) | (impostor & ~accepted)
+    return {
+        "threshold": threshold,
+        "accuracy": round(float(correct.sum()) / max(len(rows), 1), 4),
+        "false_accept_rate": _rate(impostor & accepted, impostor),
+        "misidentification_rate": _rate(genuine & accepted & (pred_ids != true_ids), genuine),
+    }
+
+
+# ─── Public API ───────────────────────────────────────────────────────────────
+
+def sweep(
+    test_dir: str | None = None,
+    holdout: float = 0.2,
+    impostors: float = 0.2,
+    scale_factors=SCALE_FACTORS,
+    min_neighbors=MIN_NEIGHBORS,
+    min_sizes=MIN_SIZES,
+    thresholds=THRESHOLDS,
+    workers: int | None = None,
+    seed: int = 0,
+    config: Config | None = None,
+) -> list[dict]:
+    """
+    Evaluasi grid setting detector × threshold.
+
+    Args:
+        test_dir     : Folder uji berlabel `<test_dir>/<nama>/*.jpg` berisi gambar
+                       utuh (bukan crop), dicocokkan dengan model yang sedang
+                       aktif. None = pakai sebagian dataset/ sebagai data uji
+                       dan latih gallery sementara dari sisanya (model
+                       tersimpan tidak disentuh). Foto dataset/ sudah berupa
+                       crop wajah, jadi deteksi dilewati: scale_factors,
+                       min_neighbors, dan min_sizes diabaikan dan hanya
+                       threshold yang di-sweep (field detector dan
+                       detection_rate bernilai None).
+        holdout      : Porsi foto per user untuk data uji jika test_dir None.
+        impostors    : Porsi user yang ditahan seluruhnya sebagai orang tak
+                       dikenal jika test_dir None (0 = tanpa impostor).
+        scale_factors: Nilai scaleFactor cascade.
+        min_neighbors: Nilai minNeighbors cascade.
+        min_sizes    : Nilai minSize (piksel, persegi) cascade.
+        thresholds   : Nilai CONFIDENCE_THRESHOLD.
+        workers      : Jumlah proses paralel (default: jumlah CPU).
+        seed         : Seed pembagian dataset.
+        config       : Path dan setting (None = Config() di direktori kerja).
+
+    Returns:
+        List of dict, satu per kombinasi, terurut dari akurasi tertinggi:
+        {"scale_factor", "min_neighbors", "min_size", "threshold", "samples",
+         "detection_rate", "accuracy", "false_accept_rate",
+         "misidentification_rate", "latency_mean_ms", "latency_p95_ms"}
+
+        accuracy menghitung penolakan orang tak dikenal sebagai benar.
+        false_accept_rate = porsi percobaan orang tak dikenal yang diterima
+        (None jika data uji tidak punya orang tak dikenal, mis. hanya satu
+        user atau impostors=0); misidentification_rate = porsi wajah terdaftar yang
+        diterima sebagai orang lain.
+
+    Raises:
+        ValueError  : Jika tidak ada sampel uji.
+        RuntimeError: Jika belum ada data terdaftar / model.
+    """
+    config = config or Config()
+    labels = lbl.load(config)
+    if not labels:
+        raise RuntimeError("Belum ada data terdaftar. Daftarkan wajah terlebih dahulu.")
+
+    if test_dir is not None:
+        settings = list(itertools.product(scale_factors, min_neighbors, min_sizes))
+    else:
+        settings = [None]   # crop dataset: tanpa deteksi
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if test_dir is not None:
+            samples = _labeled_samples(test_dir, labels)
+            model_path = None
+            detector._load_model(config)   # gagal cepat jika belum ada model
+        else:
+            train_items, samples = _split_dataset(labels, holdout, impostors, seed, config)
+            gallery = trainer._build_gallery(train_items, chunk_size=None, config=config)
+            if not len(gallery):
+                raise RuntimeError("Tidak ada gambar ditemukan di folder dataset.")
+            model_path = gallery.save(os.path.join(tmp_dir, "sweep.lbph"))
+        if not samples:
+            raise ValueError("Tidak ada sampel uji.")
+
+        jobs = [(setting, samples, model_path, config) for setting in settings]
+        with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count() or 1)) as pool:
+            all_rows = list(pool.map(_run_setting, jobs))
+
+    report = []
+    for setting, rows in zip(settings, all_rows):
+        scale_factor, neighbors, min_size = setting or (None, None, None)
+        latency_ms = np.array([r[3] for r in rows]) * 1000
+        detected = sum(1 for r in rows if r[1] is not None)
+        detection_rate = round(detected / max(len(rows), 1), 4) if setting else None
+        for threshold in thresholds:
+            report.append({
+                "scale_factor": scale_factor,
+                "min_neighbors": neighbors,
+                "min_size": min_size,
+                "samples": len(rows),
+                "detection_rate": detection_rate,
+                **_score(rows, threshold),
+                "latency_mean_ms": round(float(latency_ms.mean()), 3) if len(rows) else None,
+                "latency_p95_ms": round(float(np.percentile(latency_ms, 95)), 3) if len(rows) else None,
+            })
+    report.sort(key=lambda r: (-r["accuracy"], r["false_accept_rate"] or 0.0,
+                               r["misidentification_rate"] or 0.0, r["latency_mean_ms"] or 0))
+    return report
@@ -0,0 +1,236 @@
+"""
+facerecog/events.py
+Log kejadian pengenalan wajah, ditulis asinkron dalam batch.
+
+Loop deteksi hanya memanggil `EventLog.emit()`: hasil dimasukkan ke buffer di
+memori (tanpa I/O) lalu thread background menulisnya per batch ke file
+append-only — JSON Lines atau SQLite. Buffer dibatasi; jika penuh, kejadian
+dibuang sesuai `drop` dan dihitung di `dropped`, sehingga logging tidak pernah
+memperlambat frame meskipun disk lambat. Batch yang gagal ditulis juga dihitung
+di `dropped` (error terakhir di `last_error`) dan writer dibuka ulang untuk
+batch berikutnya — satu error I/O tidak menghentikan logging.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Iterable
+
+from .results import FaceResult
+
+FORMATS       = ("jsonl", "sqlite")
+DROP_POLICIES = ("oldest", "newest")
+_SQLITE_EXTS  = {".db", ".sqlite", ".sqlite3"}
+_COLUMNS      = ("ts", "source", "user_id", "name", "confidence", "recognized", "x", "y", "w", "h")
+
+
+class EventLog:
+    """
+    Sink kejadian pengenalan untuk detect_camera()/detect_image().
+
+        with EventLog("logs/recognitions.jsonl") as events:
+            fr = FaceRecog(events=events)
+            fr.detect_camera()
+
+    Setiap wajah menjadi satu record:
+        {"ts", "source", "user_id", "name", "confidence", "recognized", "x", "y", "w", "h"}
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str | None = None,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        max_pending: int = 10_000,
+        drop: str = "oldest",
+    ):
+        """
+        Args:
+            path          : File tujuan (dibuat saat batch pertama ditulis).
+            format        : "jsonl" atau "sqlite"; None = dari ekstensi
+                            (.db/.sqlite/.sqlite3 = sqlite, lainnya jsonl).
+            batch_size    : Tulis segera jika sudah ada sebanyak ini kejadian.
+            flush_interval: Jeda maksimum (detik) sebelum kejadian ditulis.
+            max_pending   : Batas kejadian di buffer yang belum ditulis.
+            drop          : Jika buffer penuh: "oldest" = buang kejadian terlama,
+                            "newest" = buang kejadian yang baru masuk.
+
+        Raises:
+            ValueError: Jika format, drop, atau batas tidak valid.
+        """
+        if format is None:
+            format = "sqlite" if os.path.splitext(path)[1].lower() in _SQLITE_EXTS else "jsonl"
+        if format not in FORMATS:
+            raise ValueError(f"format harus salah satu dari: {', '.join(FORMATS)}")
+        if drop not in DROP_POLICIES:
+            raise ValueError(f"drop harus salah satu dari: {', '.join(DROP_POLICIES)}")
+        if batch_size < 1 or max_pending < 1:
+            raise ValueError("batch_size dan max_pending harus >= 1.")
+
+        self.path           = os.path.abspath(path)
+        self.format         = format
+        self.batch_size     = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending    = max_pending
+        self.drop           = drop
+        self.dropped        = 0     # kejadian yang dibuang (buffer penuh / batch gagal ditulis)
+        self.written        = 0     # jumlah kejadian yang sudah ditulis
+        self.last_error: Exception | None = None   # error writer terakhir
+
+        self._pending: deque = deque()
+        self._inflight = 0          # kejadian yang sedang ditulis writer
+        self._cond    = threading.Condition()
+        self._closed  = False
+        self._thread  = threading.Thread(target=self._run, name="facerecog-events", daemon=True)
+        self._thread.start()
+
+    # ── Hot path ─────────────────────────────────────────────────────────────
+
+    def emit(self, results: Iterable[FaceResult], source: str | None = None) -> None:
+        """
+        Catat hasil pengenalan satu frame/gambar. Tidak pernah menunggu I/O.
+
+        Args:
+            results: FaceResult dari satu frame.
+            source : Asal frame, mis. "camera:0" atau path gambar.
+        """
+        ts = time.time()
+        with self._cond:
+            if self._closed:
+                return
+            for result in results:
+                if len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                    if self.drop == "newest":
+                        continue
+                    self._pending.popleft()
+                self._pending.append((ts, source, result))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    # ── Writer ───────────────────────────────────────────────────────────────
+
+    def _take_batch(self) -> list:
+        with self._cond:
+            if not self._closed and len(self._pending) < self.batch_size:
+                self._cond.wait(self.flush_interval)
+            self._inflight = min(len(self._pending), self.batch_size)
+            return [self._pending.popleft() for _ in range(self._inflight)]
+
+    def _run(self) -> None:
+        writer = None
+        while True:
+            batch = self._take_batch()
+            if batch:
+                try:
+                    if writer is None:
+                        writer = _SqliteWriter(self.path) if self.format == "sqlite" else _JsonlWriter(self.path)
+                    writer.write([_record(*event) for event in batch])
+                    self.written += len(batch)
+                except Exception as exc:
+                    # Batch dibuang; writer dibuka ulang untuk batch berikutnya
+                    writer = _close_quietly(writer)
+                    with self._cond:
+                        self.dropped += len(batch)
+                        self.last_error = exc
+                        self._inflight = 0
+                        if not self._closed:
+                            self._cond.wait(self.flush_interval)   # jeda sebelum mencoba lagi
+                    continue
+                with self._cond:
+                    self._inflight = 0
+                continue
+            with self._cond:
+                if self._closed and not self._pending:
+                    break
+        _close_quietly(writer)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Tunggu sampai semua kejadian yang sudah di-emit tertulis."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify()
+        while self._thread.is_alive():
+            with self._cond:
+                if not self._pending and not self._inflight:
+                    break
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.01)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Tulis sisa kejadian lalu hentikan writer. Kejadian setelah close() diabaikan."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return (f"EventLog(path='{self.path}', format='{self.format}', "
+                f"written={self.written}, dropped={self.dropped}, last_error={self.last_error!r})")
+
+
+# ─── Internal Helpers ─────────────────────────────────────────────────────────
+
+def _record(ts: float, source: str | None, result: FaceResult) -> dict:
+    return {
+        "ts": round(ts, 6),
+        "source": source,
+        "user_id": result.user_id,
+        "name": result.name,
+        "confidence": round(float(result.confidence), 4),
+        "recognized": bool(result.recognized),
+        "x": int(result.x), "y": int(result.y), "w": int(result.w), "h": int(result.h),
+    }
+
+
+def _close_quietly(writer) -> None:
+    if writer is not None:
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+
+class _JsonlWriter:
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, records: list[dict]) -> None:
+        self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _SqliteWriter:
+    def __init__(self, path: str):
+        import sqlite3   # hanya dimuat jika format sqlite dipakai
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Koneksi dibuat di thread writer dan hanya dipakai di sana
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "ts REAL, source TEXT, user_id INTEGER, name TEXT, confidence REAL, "
+            "recognized INTEGER, x INTEGER, y INTEGER, w INTEGER, h INTEGER)"
+        )
+        self._conn.commit()
+        self._insert = (f"INSERT INTO events ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' for _ in _COLUMNS)})")
+
+    def write(self, records: list[dict]) -> None:
+        with self._conn:   # satu transaksi per batch
+            self._conn.executemany(self._insert, [tuple(r[c] for c in _COLUMNS) for r in records])
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,390 @@
+"""
+facerecog/gallery.py
+Gallery LBPH berbasis numpy + format model biner yang ringkas (.lbph).
+
+Format .lbph menyimpan histogram sebagai satu array biner (float32, atau
+float16/uint16 terkuantisasi) beserta label sampel dan metadata, sehingga bisa
+di-memory-map: cold start tidak perlu mem-parse YAML ratusan MB.
+
+Layout file:
+    magic "FRLBPH01" | uint32 panjang header | header JSON
+    | label int32 (N,) | histogram (N, dim)   — keduanya rata 64 byte
+"""
+import json
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+
+from . import lbp
+from .config import Config
+from .storage import atomic_path
+
+MAGIC   = b"FRLBPH01"
+_ALIGN  = 64
+_CHUNK  = 256     # baris gallery per blok perhitungan jarak
+DTYPES  = {"float32": "<f4", "float16": "<f2", "uint16": "<u2"}
+
+
+def _aligned(offset: int) -> int:
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def release_pages(array) -> None:
+    """
+    Tulis halaman np.memmap ke file lalu lepaskan dari memori proses, agar
+    membaca/menulis array besar per blok tidak membuat RSS tumbuh mengikuti
+    ukuran file. Bukan memmap, atau platform tanpa madvise: tidak melakukan apa-apa.
+    """
+    if not isinstance(array, np.memmap):
+        return
+    mapping = getattr(array, "_mmap", None)
+    if mapping is None:
+        return
+    if array.mode in ("r+", "w+"):
+        mapping.flush()
+    if hasattr(mapping, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+        mapping.madvise(mmap.MADV_DONTNEED)
+
+
+class _Matcher:
+    """predict()/predict_many() di atas histogram() + match() milik subclass."""
+
+    def predict(self, face: np.ndarray) -> tuple[int, float]:
+        """Sama seperti LBPHFaceRecognizer.predict(): (label, confidence)."""
+        return self.match(self.histogram(face))[0]
+
+    def predict_many(self, faces) -> list[tuple[int, float]]:
+        """
+        predict() untuk banyak wajah sekaligus.
+
+        Args:
+            faces: List crop grayscale (ukuran boleh beda) atau array (N, H, W).
+        """
+        if isinstance(faces, np.ndarray) and faces.ndim == 3:
+            hists = self.histogram(faces)
+        else:
+            hists = np.vstack([self.histogram(f) for f in faces]) if len(faces) else None
+        return self.match(hists) if hists is not None else []
+
+
+class Gallery(_Matcher):
+    """
+    Kumpulan histogram LBP + label sampel, dengan predict() setara
+    LBPHFaceRecognizer.predict().
+
+    Histogram boleh berupa np.memmap dan/atau terkuantisasi; konversi ke
+    float32 dilakukan per blok saat menghitung jarak.
+    """
+
+    def __init__(
+        self,
+        histograms: np.ndarray,
+        labels: np.ndarray,
+        radius: int = lbp.RADIUS,
+        neighbors: int = lbp.NEIGHBORS,
+        grid_x: int = lbp.GRID_X,
+        grid_y: int = lbp.GRID_Y,
+        scale: float = 1.0,
+    ):
+        self.histograms = histograms
+        self.labels     = np.asarray(labels, dtype=np.int32).ravel()
+        self.radius     = radius
+        self.neighbors  = neighbors
+        self.grid_x     = grid_x
+        self.grid_y     = grid_y
+        self.scale      = scale
+        self._sums      = None   # Σ histogram per baris, dihitung saat match pertama
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def params(self) -> dict:
+        """Parameter LBP, untuk menghitung histogram query yang kompatibel."""
+        return {"radius": self.radius, "neighbors": self.neighbors,
+                "grid_x": self.grid_x, "grid_y": self.grid_y}
+
+    @property
+    def dtype(self) -> str:
+        """Nama tipe penyimpanan histogram ("float32", "float16" atau "uint16")."""
+        for name, code in DTYPES.items():
+            if np.dtype(code) == self.histograms.dtype.newbyteorder("<"):
+                return name
+        return "float32"
+
+    def without(self, user_ids) -> "Gallery":
+        """
+        Gallery baru tanpa sampel milik `user_ids`.
+
+        Histogram sampel lain disalin apa adanya (tetap terkuantisasi jika
+        sebelumnya terkuantisasi) — tidak ada dataset yang dibaca ulang.
+        """
+        keep = ~np.isin(self.labels, np.asarray(list(user_ids), dtype=np.int32))
+        histograms = np.asarray(self.histograms[keep]) if len(self.labels) else self.histograms
+        return Gallery(histograms, self.labels[keep], **self.params, scale=self.scale)
+
+    # ── Konstruksi ───────────────────────────────────────────────────────────
+
+    @classmethod
+    def from_recognizer(cls, recognizer) -> "Gallery":
+        """Ambil histogram & label dari LBPHFaceRecognizer yang sudah di-train/read."""
+        hists = recognizer.getHistograms()
+        histograms = (np.vstack([h.reshape(1, -1) for h in hists]).astype(np.float32)
+                      if hists else np.zeros((0, 0), dtype=np.float32))
+        return cls(
+            histograms,
+            recognizer.getLabels(),
+            radius=recognizer.getRadius(),
+            neighbors=recognizer.getNeighbors(),
+            grid_x=recognizer.getGridX(),
+            grid_y=recognizer.getGridY(),
+        )
+
+    @classmethod
+    def load(cls, path: str | None = None, mmap: bool = True) -> "Gallery":
+        """
+        Muat gallery dari file .lbph.
+
+        Args:
+            path: Path file .lbph (None = Config().model_bin_path).
+            mmap: Memory-map histogram (default) alih-alih membaca seluruhnya.
+
+        Raises:
+            ValueError: Jika file bukan model .lbph yang valid.
+        """
+        path = path or Config().model_bin_path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Bukan file model .lbph: {path}")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        count, dim = header["count"], header["dim"]
+        dtype = DTYPES[header["dtype"]]
+        labels = np.fromfile(path, dtype="<i4", count=count, offset=header["labels_offset"])
+        if mmap and count:
+            histograms = np.memmap(path, dtype=dtype, mode="r",
+                                   offset=header["hist_offset"], shape=(count, dim))
+        else:
+            histograms = np.fromfile(path, dtype=dtype, count=count * dim,
+                                     offset=header["hist_offset"]).reshape(count, dim)
+        return cls(
+            histograms, labels,
+            radius=header["radius"], neighbors=header["neighbors"],
+            grid_x=header["grid_x"], grid_y=header["grid_y"],
+            scale=header["scale"],
+        )
+
+    # ── Simpan ───────────────────────────────────────────────────────────────
+
+    def save(self, path: str | None = None, dtype: str = "float32") -> str:
+        """
+        Tulis gallery ke file .lbph secara atomik.
+
+        Args:
+            path : Path tujuan (None = Config().model_bin_path).
+            dtype: "float32" (tanpa kehilangan), "float16" atau "uint16" (½ ukuran).
+
+        Returns:
+            Path file yang ditulis.
+        """
+        path = path or Config().model_bin_path
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype harus salah satu dari: {', '.join(DTYPES)}")
+        count = len(self.labels)
+        dim = self.histograms.shape[1] if count else 0
+        scale = 1.0 / 65535 if dtype == "uint16" else 1.0
+
+        header = {
+            "version": 1, "count": count, "dim": dim, "dtype": dtype, "scale": scale,
+            **self.params, "created": time.time(),
+        }
+        # Offset bergantung pada panjang header itu sendiri — ulangi sampai stabil
+        labels_offset = hist_offset = 0
+        while True:
+            header["labels_offset"], header["hist_offset"] = labels_offset, hist_offset
+            header_bytes = json.dumps(header).encode("utf-8")
+            offsets = (_aligned(len(MAGIC) + 4 + len(header_bytes)),)
+            offsets += (_aligned(offsets[0] + 4 * count),)
+            if offsets == (labels_offset, hist_offset):
+                break
+            labels_offset, hist_offset = offsets
+
+        with atomic_path(path) as tmp:
+            with open(tmp, "wb") as f:
+                f.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+                f.write(b"\0" * (labels_offset - f.tell()))
+                f.write(self.labels.astype("<i4").tobytes())
+                f.write(b"\0" * (hist_offset - f.tell()))
+                for start in range(0, count, _CHUNK):
+                    f.write(self._encode(self._block(start, start + _CHUNK), dtype).tobytes())
+                    release_pages(self.histograms)
+                f.flush()
+                os.fsync(f.fileno())
+        return path
+
+    @staticmethod
+    def _encode(block: np.ndarray, dtype: str) -> np.ndarray:
+        if dtype == "uint16":
+            return np.rint(np.clip(block, 0.0, 1.0) * 65535).astype("<u2")
+        return block.astype(DTYPES[dtype])
+
+    # ── Pencocokan ───────────────────────────────────────────────────────────
+
+    def _block(self, start: int, stop: int) -> np.ndarray:
+        block = np.asarray(self.histograms[start:stop], dtype=np.float32)
+        return block * np.float32(self.scale) if self.scale != 1.0 else block
+
+    def histogram(self, face: np.ndarray) -> np.ndarray:
+        """Histogram LBP wajah (H, W) atau batch (N, H, W) dengan parameter gallery ini."""
+        return lbp.spatial_histogram(face, **self.params)
+
+    def distances(self, query_hists: np.ndarray) -> np.ndarray:
+        """
+        Matriks jarak chi-square antara histogram query dan seluruh gallery.
+
+        Args:
+            query_hists: (dim,) atau (M, dim).
+
+        Returns:
+            float64 (M, N).
+        """
+        queries = np.atleast_2d(np.asarray(query_hists, dtype=np.float32))
+        sums = self._row_sums()
+        result = np.empty((len(queries), len(self.labels)), dtype=np.float64)
+        for start in range(0, len(self.labels), _CHUNK):
+            stop = min(start + _CHUNK, len(self.labels))
+            lbp.chi_square_many(
+                queries, self.histograms[start:stop], out=result[:, start:stop],
+                gallery_sums=sums[start:stop], scale=self.scale,
+            )
+        return result
+
+    def _row_sums(self) -> np.ndarray:
+        """Σ histogram per baris (sudah dikali scale), dihitung per blok lalu disimpan."""
+        if self._sums is None:
+            sums = np.zeros(len(self.labels), dtype=np.float64)
+            for start in range(0, len(self.labels), _CHUNK):
+                block = self.histograms[start:start + _CHUNK]
+                sums[start:start + len(block)] = block.sum(axis=1, dtype=np.float64)
+            self._sums = sums * self.scale
+        return self._sums
+
+    def match(self, query_hists: np.ndarray) -> list[tuple[int, float]]:
+        """(label, jarak) sampel terdekat untuk setiap histogram query."""
+        if not len(self.labels):
+            return [(-1, float("inf"))] * len(np.atleast_2d(query_hists))
+        dist = self.distances(query_hists)
+        best = dist.argmin(axis=1)
+        return [(int(self.labels[j]), float(dist[i, j])) for i, j in enumerate(best)]
+
+
+class ShardedGallery(_Matcher):
+    """
+    Gallery yang dipecah menjadi beberapa shard (.lbph per shard).
+
+    Histogram query dihitung sekali, lalu dicocokkan ke semua shard secara
+    paralel (numpy melepas GIL saat menghitung jarak) dan hasil terbaik
+    dari tiap shard digabung.
+    """
+
+    def __init__(self, shards: list[Gallery], workers: int | None = None):
+        self.params  = shards[0].params if shards else {
+            "radius": lbp.RADIUS, "neighbors": lbp.NEIGHBORS,
+            "grid_x": lbp.GRID_X, "grid_y": lbp.GRID_Y,
+        }
+        self.shards  = [g for g in shards if len(g)]
+        self._pool   = ThreadPoolExecutor(max_workers=workers or max(len(self.shards), 1))
+
+    def __len__(self) -> int:
+        return sum(len(g) for g in self.shards)
+
+    @classmethod
+    def load(cls, manifest_path: str | None = None, mmap: bool = True) -> "ShardedGallery":
+        """Muat semua shard yang tercatat di manifest (None = Config().shards_manifest)."""
+        manifest_path = manifest_path or Config().shards_manifest
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+        directory = os.path.dirname(manifest_path)
+        return cls([
+            Gallery.load(os.path.join(directory, entry["file"]), mmap=mmap)
+            for entry in manifest["entries"]
+        ])
+
+    def histogram(self, face: np.ndarray) -> np.ndarray:
+        return lbp.spatial_histogram(face, **self.params)
+
+    def match(self, query_hists: np.ndarray) -> list[tuple[int, float]]:
+        """(label, jarak) terbaik di antara semua shard untuk setiap histogram query."""
+        count = len(np.atleast_2d(query_hists))
+        best = [(-1, float("inf"))] * count
+        for shard_result in self._pool.map(lambda g: g.match(query_hists), self.shards):
+            best = [min(a, b, key=lambda r: r[1]) for a, b in zip(best, shard_result)]
+        return best
+
+
+# ─── Konversi ─────────────────────────────────────────────────────────────────
+
+def write_yml(gallery: Gallery, path: str | None = None, threshold: float | None = None) -> str:
+    """
+    Tulis gallery sebagai trainer.yml yang bisa dibaca LBPHFaceRecognizer.read(),
+    secara atomik. Dipakai untuk mengubah model YAML tanpa training ulang.
+    """
+    path = path or Config().model_path
+    with atomic_path(path) as tmp:
+        fs = cv2.FileStorage(tmp, cv2.FILE_STORAGE_WRITE)
+        fs.startWriteStruct("opencv_lbphfaces", cv2.FileNode_MAP)
+        fs.write("threshold", float(threshold if threshold is not None else np.finfo(np.float64).max))
+        for key, value in gallery.params.items():
+            fs.write(key, int(value))
+        fs.startWriteStruct("histograms", cv2.FileNode_SEQ)
+        for start in range(0, len(gallery), _CHUNK):
+            for row in gallery._block(start, start + _CHUNK):
+                fs.write("", row.reshape(1, -1))
+            release_pages(gallery.histograms)
+        fs.endWriteStruct()
+        fs.write("labels", gallery.labels.reshape(-1, 1))
+        fs.startWriteStruct("labelsInfo", cv2.FileNode_SEQ)
+        fs.endWriteStruct()
+        fs.endWriteStruct()
+        fs.release()
+    return path
+
+
+def convert_yml(
+    src: str | None = None,
+    dst: str | None = None,
+    dtype: str = "float32",
+    config: Config | None = None,
+) -> dict:
+    """
+    Konversi model YAML OpenCV (trainer.yml) ke format biner .lbph.
+
+    src/dst None = config.model_path / config.model_bin_path.
+
+    Returns:
+        dict: {"samples": int, "yml_bytes": int, "lbph_bytes": int, "model_path": str}
+
+    Raises:
+        RuntimeError: Jika file model sumber tidak ada.
+    """
+    config = config or Config()
+    src = src or config.model_path
+    dst = dst or config.model_bin_path
+    if not os.path.exists(src):
+        raise RuntimeError(f"Model tidak ditemukan: {src}")
+    recognizer = cv2.face.LBPHFaceRecognizer_create()
+    recognizer.read(src)
+    gallery = Gallery.from_recognizer(recognizer)
+    gallery.save(dst, dtype=dtype)
+    return {
+        "samples": len(gallery),
+        "yml_bytes": os.path.getsize(src),
+        "lbph_bytes": os.path.getsize(dst),
+        "model_path": dst,
+    }
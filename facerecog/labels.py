@@ -4,21 +4,44 @@ Helper CRUD untuk file labels.json.
 """
 import json
 import os
-from .config import LABELS_FILE
+from contextlib import contextmanager
 
+from .config import Config
+from .storage import atomic_path, file_lock
 
-def load() -> dict:
+
+def load(config: Config | None = None) -> dict:
     """Muat labels dari file JSON. Return dict kosong jika belum ada."""
-    if os.path.exists(LABELS_FILE):
-        with open(LABELS_FILE, "r") as f:
+    labels_file = (config or Config()).labels_file
+    if os.path.exists(labels_file):
+        with open(labels_file, "r") as f:
             return json.load(f)
     return {}
 
 
-def save(labels: dict) -> None:
-    """Simpan labels ke file JSON."""
-    with open(LABELS_FILE, "w") as f:
-        json.dump(labels, f, indent=2, ensure_ascii=False)
+def save(labels: dict, config: Config | None = None) -> None:
+    """Simpan labels ke file JSON secara atomik (tulis file sementara lalu rename)."""
+    with atomic_path((config or Config()).labels_file) as tmp:
+        with open(tmp, "w") as f:
+            json.dump(labels, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+@contextmanager
+def locked(config: Config | None = None):
+    """
+    Read-modify-write labels.json di bawah lock antar-proses.
+
+    Yield dict labels terbaru; perubahan pada dict disimpan saat keluar blok.
+    Pakai ini (bukan load() + save()) untuk setiap perubahan labels agar
+    proses lain tidak saling menimpa atau memakai ID yang sama.
+    """
+    config = config or Config()
+    with file_lock(config.labels_file):
+        labels = load(config)
+        yield labels
+        save(labels, config)
 
 
 def next_id(labels: dict) -> int:
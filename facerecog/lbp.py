@@ -0,0 +1,156 @@
+"""
+facerecog/lbp.py
+Implementasi numpy dari histogram LBP spasial dan jarak chi-square,
+identik dengan yang dipakai cv2.face.LBPHFaceRecognizer.
+
+Dipakai oleh Gallery untuk mencocokkan wajah tanpa objek recognizer OpenCV,
+dan mendukung batch: array (N, H, W) diproses sekaligus.
+"""
+import numpy as np
+
+# Default parameter LBPHFaceRecognizer_create()
+RADIUS    = 1
+NEIGHBORS = 8
+GRID_X    = 8
+GRID_Y    = 8
+
+
+def elbp(src: np.ndarray, radius: int = RADIUS, neighbors: int = NEIGHBORS) -> np.ndarray:
+    """
+    Extended (circular) LBP dengan interpolasi bilinear, seperti elbp_() OpenCV.
+
+    Args:
+        src: Gambar grayscale (H, W) atau batch (N, H, W).
+
+    Returns:
+        Kode LBP int32 berukuran (..., H - 2*radius, W - 2*radius).
+    """
+    src = np.asarray(src, dtype=np.float32)
+    rows, cols = src.shape[-2:]
+    out_h, out_w = rows - 2 * radius, cols - 2 * radius
+    dst = np.zeros(src.shape[:-2] + (max(out_h, 0), max(out_w, 0)), dtype=np.int32)
+    if out_h <= 0 or out_w <= 0:
+        return dst
+
+    center = src[..., radius:radius + out_h, radius:radius + out_w]
+    eps = np.finfo(np.float32).eps
+
+    def shifted(dy: int, dx: int) -> np.ndarray:
+        return src[..., radius + dy:radius + dy + out_h, radius + dx:radius + dx + out_w]
+
+    for n in range(neighbors):
+        x = np.float32(radius * np.cos(2.0 * np.pi * n / neighbors))
+        y = np.float32(-radius * np.sin(2.0 * np.pi * n / neighbors))
+        fx, fy = int(np.floor(x)), int(np.floor(y))
+        cx, cy = int(np.ceil(x)), int(np.ceil(y))
+        ty, tx = y - fy, x - fx
+        w1 = (1 - tx) * (1 - ty)
+        w2 = tx * (1 - ty)
+        w3 = (1 - tx) * ty
+        w4 = tx * ty
+        t = (w1 * shifted(fy, fx) + w2 * shifted(fy, cx)
+             + w3 * shifted(cy, fx) + w4 * shifted(cy, cx))
+        bit = (t > center) | (np.abs(t - center) < eps)
+        dst += bit.astype(np.int32) << n
+    return dst
+
+
+def spatial_histogram(
+    src: np.ndarray,
+    radius: int = RADIUS,
+    neighbors: int = NEIGHBORS,
+    grid_x: int = GRID_X,
+    grid_y: int = GRID_Y,
+) -> np.ndarray:
+    """
+    Histogram LBP per sel grid, dinormalisasi dan digabung menjadi satu vektor.
+
+    Args:
+        src: Gambar grayscale (H, W) atau batch berukuran sama (N, H, W).
+
+    Returns:
+        float32 (grid_x * grid_y * 2**neighbors,) atau (N, dim) untuk batch.
+    """
+    src = np.asarray(src)
+    batched = src.ndim == 3
+    codes = elbp(src if batched else src[None], radius, neighbors)
+
+    patterns = 2 ** neighbors
+    cells = grid_x * grid_y
+    count = codes.shape[0]
+    cell_h, cell_w = codes.shape[1] // grid_y, codes.shape[2] // grid_x
+    if cell_h == 0 or cell_w == 0:
+        hist = np.zeros((count, cells * patterns), dtype=np.float32)
+        return hist if batched else hist[0]
+
+    # (N, gy, h, gx, w) -> (N, gy, gx, h*w): satu baris per sel grid
+    codes = codes[:, :grid_y * cell_h, :grid_x * cell_w]
+    codes = codes.reshape(count, grid_y, cell_h, grid_x, cell_w).transpose(0, 1, 3, 2, 4)
+    codes = codes.reshape(count, cells, cell_h * cell_w)
+
+    offsets = (np.arange(count * cells, dtype=np.int64) * patterns).reshape(count, cells, 1)
+    hist = np.bincount((codes + offsets).ravel(), minlength=count * cells * patterns)
+    hist = hist.reshape(count, cells * patterns).astype(np.float32) / np.float32(cell_h * cell_w)
+    return hist if batched else hist[0]
+
+
+def chi_square(query: np.ndarray, gallery: np.ndarray) -> np.ndarray:
+    """
+    Jarak chi-square alternatif (HISTCMP_CHISQR_ALT) antara satu histogram
+    dan setiap baris `gallery` — ukuran yang sama dengan LBPH predict().
+
+    Returns:
+        float64 (N,) — lebih kecil = lebih mirip.
+    """
+    return chi_square_many(query, np.atleast_2d(gallery))[0]
+
+
+def chi_square_many(
+    queries: np.ndarray,
+    gallery: np.ndarray,
+    out: np.ndarray | None = None,
+    gallery_sums: np.ndarray | None = None,
+    scale: float = 1.0,
+) -> np.ndarray:
+    """
+    chi_square() untuk banyak query sekaligus: matriks jarak (M, N).
+
+    Memakai identitas (g - q)² / (g + q) = g + q - 4gq / (g + q). Bin dengan
+    q = 0 hanya menyumbang g, jadi jarak = 2·(Σg + Σq - 4·Σ_{q>0} gq/(g+q))
+    dan hanya kolom tempat query tidak nol (±25% untuk wajah 100x100) yang
+    dibaca dari gallery. Σg per baris bisa dihitung sekali lalu diberikan
+    lewat `gallery_sums`.
+
+    Args:
+        queries     : (dim,) atau (M, dim).
+        gallery     : (N, dim), dtype apa saja (mis. memmap terkuantisasi);
+                      nilai sebenarnya = gallery * scale. Sebaiknya blok kecil
+                      yang muat di cache.
+        out         : Array float64 (M, N) tujuan (boleh view).
+        gallery_sums: Σ baris gallery (sudah dikali scale), float64 (N,).
+        scale       : Faktor skala nilai gallery.
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    if out is None:
+        out = np.empty((len(queries), len(gallery)), dtype=np.float64)
+    if gallery_sums is None:
+        gallery_sums = np.asarray(gallery).sum(axis=1, dtype=np.float64) * scale
+    for i, query in enumerate(queries):
+        nz = np.flatnonzero(query)
+        qn = query[nz]
+        sub = np.take(gallery, nz, axis=1)
+        if sub.dtype != np.float32:
+            sub = sub.astype(np.float32)
+        if scale != 1.0:
+            sub *= np.float32(scale)
+        den = sub + qn          # > 0: qn > 0 dan histogram non-negatif
+        sub *= qn
+        sub /= den
+        overlap = sub @ np.ones(len(nz), dtype=np.float32)
+        np.multiply(overlap, -4.0, out=out[i])
+        out[i] += gallery_sums + float(qn.sum(dtype=np.float64))
+    out *= 2.0
+    # Bentuk yang diuraikan bisa sedikit negatif karena pembatalan floating
+    # point (mis. crop identik); jarak chi-square tidak pernah < 0.
+    np.maximum(out, 0.0, out=out)
+    return out
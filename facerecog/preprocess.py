@@ -0,0 +1,138 @@
+"""
+facerecog/preprocess.py
+Normalisasi crop wajah: resize ke ukuran tetap + histogram equalization opsional.
+
+Tahap yang sama dipakai di dataset.py, trainer.py, dan detector.py sehingga
+histogram LBP gallery dan query selalu dihitung dari input yang setara, dan
+crop berukuran seragam bisa ditumpuk menjadi satu array untuk diproses batch.
+
+Crop di dataset/ disimpan sudah dinormalisasi. Setting yang dipakai dicatat
+per user di `dataset/<id>/normalization.json`; saat crop dibaca ulang
+(load_stored_face) hanya langkah yang belum diterapkan yang dijalankan, agar
+equalization tidak diterapkan dua kali tetapi juga tidak terlewat.
+"""
+import json
+import os
+
+import numpy as np
+import cv2
+
+from .config import FACE_SIZE, EQUALIZE_HIST
+from .storage import atomic_path
+
+NORMALIZATION_FILE = "normalization.json"
+_RAW = {"face_size": None, "equalize_hist": False}   # crop lama tanpa catatan
+
+
+def normalize_face(
+    face: np.ndarray,
+    size: tuple[int, int] | None = FACE_SIZE,
+    equalize: bool = EQUALIZE_HIST,
+) -> np.ndarray:
+    """
+    Normalisasi satu crop wajah grayscale.
+
+    Args:
+        face    : Crop grayscale (H, W).
+        size    : (lebar, tinggi) tujuan; None = tidak di-resize.
+        equalize: Terapkan cv2.equalizeHist setelah resize.
+
+    Returns:
+        Crop uint8 yang sudah dinormalisasi.
+    """
+    if size is not None and (face.shape[1], face.shape[0]) != tuple(size):
+        shrink = face.shape[1] > size[0] or face.shape[0] > size[1]
+        face = cv2.resize(face, tuple(size),
+                          interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+    if equalize:
+        face = cv2.equalizeHist(face)
+    return face
+
+
+def stored_normalization(person_dir: str) -> dict:
+    """
+    Setting normalisasi crop tersimpan di folder user:
+    {"face_size": [lebar, tinggi] | None, "equalize_hist": bool}.
+    Folder tanpa catatan (registrasi versi lama) dianggap crop mentah.
+    """
+    try:
+        with open(os.path.join(person_dir, NORMALIZATION_FILE), "r") as f:
+            stored = json.load(f)
+        return {"face_size": stored.get("face_size"), "equalize_hist": bool(stored.get("equalize_hist"))}
+    except (OSError, ValueError, AttributeError):
+        return dict(_RAW)
+
+
+def save_normalization(person_dir: str, face_size, equalize: bool) -> None:
+    """Catat setting normalisasi crop di folder user (ditulis atomik)."""
+    stored = {"face_size": list(face_size) if face_size is not None else None,
+              "equalize_hist": bool(equalize)}
+    if stored == stored_normalization(person_dir):
+        return
+    with atomic_path(os.path.join(person_dir, NORMALIZATION_FILE)) as tmp:
+        with open(tmp, "w") as f:
+            json.dump(stored, f)
+
+
+def normalize_stored_face(
+    face: np.ndarray,
+    size: tuple[int, int] | None = FACE_SIZE,
+    equalize: bool = EQUALIZE_HIST,
+    stored_equalized: bool = False,
+) -> np.ndarray:
+    """
+    normalize_face() untuk crop tersimpan: resize jika ukurannya belum `size`,
+    equalize hanya jika diminta dan belum diterapkan saat crop disimpan.
+    """
+    return normalize_face(face, size, equalize and not stored_equalized)
+
+
+def load_stored_face(
+    img_path: str,
+    size: tuple[int, int] | None = FACE_SIZE,
+    equalize: bool = EQUALIZE_HIST,
+    settings: dict | None = None,
+) -> np.ndarray | None:
+    """
+    Baca crop dari dataset/<id>/ lalu normalisasi sesuai catatan folder-nya.
+
+    Args:
+        settings: Dict cache {folder: stored_normalization()} untuk dipakai
+                  ulang antar panggilan (opsional).
+
+    Returns:
+        Crop ternormalisasi, atau None jika file tidak terbaca.
+    """
+    img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    person_dir = os.path.dirname(img_path)
+    settings = {} if settings is None else settings
+    if person_dir not in settings:
+        settings[person_dir] = stored_normalization(person_dir)
+    return normalize_stored_face(img, size, equalize, settings[person_dir]["equalize_hist"])
+
+
+def normalize_faces(
+    faces,
+    size: tuple[int, int] | None = FACE_SIZE,
+    equalize: bool = EQUALIZE_HIST,
+):
+    """
+    Normalisasi banyak crop sekaligus.
+
+    Args:
+        faces: List crop grayscale atau array bertumpuk (N, H, W). Array uint8
+               yang sudah berukuran `size` (tanpa equalize) dipakai apa adanya.
+
+    Returns:
+        Array (N, tinggi, lebar) jika `size` diset, selain itu list crop.
+    """
+    if (isinstance(faces, np.ndarray) and faces.ndim == 3 and faces.dtype == np.uint8
+            and size is not None and not equalize
+            and (faces.shape[2], faces.shape[1]) == tuple(size)):
+        return np.ascontiguousarray(faces)
+    faces = [normalize_face(f, size, equalize) for f in faces]
+    if size is not None:
+        return np.stack(faces) if faces else np.empty((0, size[1], size[0]), dtype=np.uint8)
+    return faces
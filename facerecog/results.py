@@ -0,0 +1,33 @@
+"""
+facerecog/results.py
+Tipe hasil deteksi. Modul ini tidak meng-import OpenCV, sehingga bisa dipakai
+(mis. untuk type hint) tanpa biaya startup cv2.
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class FaceResult:
+    """Hasil deteksi satu wajah."""
+    x: int
+    y: int
+    w: int
+    h: int
+    user_id: Optional[int]       # None jika tidak dikenali
+    name: str                    # "Tidak Dikenal" jika tidak dikenali
+    confidence: float            # raw LBPH confidence (lebih rendah = lebih yakin)
+    recognized: bool             # True jika confidence < threshold
+
+    @property
+    def score(self) -> int:
+        """Keyakinan dalam persen (0–100). Hanya bermakna jika recognized=True."""
+        return 100 - int(self.confidence)
+
+
+@dataclass
+class DetectionResult:
+    """Hasil deteksi satu gambar."""
+    image_path: Optional[str]
+    total_faces: int
+    faces: list[FaceResult] = field(default_factory=list)
@@ -0,0 +1,111 @@
+"""
+facerecog/storage.py
+Utilitas file yang aman dipakai banyak proses sekaligus:
+lock antar-proses, penulisan atomik, dan penamaan file tanpa tabrakan.
+"""
+import os
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Kunci eksklusif antar-proses untuk `path`, memakai file `<path>.lock`.
+
+    Blocking sampai lock didapat, dilepas otomatis saat keluar dari blok `with`.
+    Lock tidak reentrant — jangan bersarang untuk path yang sama.
+    """
+    lock_path = path + ".lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK menyerah setelah ~10 detik, coba lagi
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+def _mkstemp(directory: str, prefix: str, suffix: str) -> tuple[int, str]:
+    """
+    Seperti tempfile.mkstemp(), tetapi file dibuat dengan mode 0666 dikurangi
+    umask (seperti open() biasa), bukan 0600. Mode ini ikut terbawa oleh
+    os.replace()/os.link(), sehingga proses lain (mis. layanan deteksi dengan
+    akun berbeda) tetap bisa membaca file hasilnya.
+    """
+    flags = os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    while True:
+        path = os.path.join(directory, f"{prefix}{uuid.uuid4().hex[:12]}{suffix}")
+        try:
+            return os.open(path, flags, 0o666), path
+        except FileExistsError:
+            continue
+
+
+@contextmanager
+def atomic_path(path: str):
+    """
+    Beri path sementara di folder yang sama dengan `path`; setelah blok `with`
+    selesai tanpa error, file sementara di-rename (os.replace) menjadi `path`.
+
+    Pembaca lain selalu melihat file lama atau file baru yang utuh, tidak pernah
+    setengah tertulis. Ekstensi dipertahankan agar OpenCV tetap mengenali format.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    base, ext = os.path.splitext(os.path.basename(path))
+    fd, tmp = _mkstemp(directory, prefix=f".{base}.", suffix=f".tmp{ext}")
+    os.close(fd)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_exclusive(directory: str, data: bytes, start: int, ext: str = ".jpg") -> int:
+    """
+    Tulis `data` ke `<n><ext>` dengan n pertama >= `start` yang belum dipakai.
+
+    File ditulis lengkap ke file sementara lalu di-hard-link ke nama final;
+    link gagal jika nama sudah ada, sehingga dua proses tidak pernah menimpa
+    file satu sama lain dan tidak ada yang membaca file setengah jadi.
+
+    Returns:
+        Nomor n yang dipakai.
+    """
+    fd, tmp = _mkstemp(directory, prefix=".", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        n = start
+        while True:
+            try:
+                os.link(tmp, os.path.join(directory, f"{n}{ext}"))
+                return n
+            except FileExistsError:
+                n += 1
+    finally:
+        os.remove(tmp)
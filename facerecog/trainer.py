@@ -2,54 +2,476 @@
 facerecog/trainer.py
 Melatih LBPH Face Recognizer dari seluruh dataset yang tersedia.
 """
+import hashlib
+import json
 import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import cv2
 
-from .config import DATASET_DIR, MODEL_PATH
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from . import lbp
+from .config import Config
 from . import labels as lbl
+from . import cache as hist_cache
+from .gallery import Gallery, DTYPES, release_pages, write_yml
+from .preprocess import load_stored_face
+from .storage import atomic_path, file_lock
+
+MODEL_FORMATS = ("yml", "lbph")
 
 
-def train() -> dict:
+def train(
+    model_format: str = "yml",
+    dtype: str = "float32",
+    shards: int = 0,
+    workers: int | None = None,
+    chunk_size: int | None = None,
+    config: Config | None = None,
+    cache: bool = True,
+) -> dict:
     """
     Latih model LBPH dari seluruh dataset.
 
+    Training dari beberapa proses diserialisasi dengan lock, dan model ditulis
+    atomik sehingga detector tidak pernah membaca file setengah jadi.
+
+    Args:
+        model_format: "yml" (trainer.yml, format OpenCV) atau "lbph"
+                      (trainer.lbph, biner ringkas yang bisa di-memory-map).
+                      Model format lain yang sudah ada dihapus agar tidak basi.
+        dtype       : Tipe histogram untuk format "lbph":
+                      "float32", "float16" atau "uint16".
+        shards      : > 0 = bagi user ke sejumlah shard .lbph; hanya shard yang
+                      datanya berubah yang dilatih ulang. model_format diabaikan.
+                      Tanpa cache, setiap shard dilatih di proses terpisah;
+                      dengan cache, histogram foto baru dihitung paralel lalu
+                      setiap shard disalin dari cache di proses ini.
+        workers     : Jumlah proses training shard / penghitung histogram foto
+                      baru untuk cache (default: jumlah CPU).
+        chunk_size  : Mode streaming: decode & proses foto per `chunk_size`
+                      gambar, lalu bebaskan sebelum chunk berikutnya. Histogram
+                      ditulis ke disk (cache atau file sementara di trainer_dir)
+                      dan model ditulis dari situ per blok, sehingga memori
+                      puncak bergantung pada ukuran chunk, bukan dataset.
+                      None = muat semua sekaligus (default).
+        config      : Path dan setting (None = Config() di direktori kerja).
+        cache       : Pakai cache histogram di config.cache_dir: hanya foto
+                      baru/berubah (path + mtime + ukuran) yang di-decode, sisanya
+                      diambil dari cache. Diabaikan jika config.face_size None.
+
     Returns:
         dict berisi informasi hasil training:
         {
             "total_images": int,
             "total_persons": int,
-            "model_path": str
+            "model_path": str,
+            "peak_memory_mb": float | None,          # max RSS seumur proses, lihat _peak_memory_mb()
+            "cached": int, "decoded": int,           # hanya jika cache dipakai
+            "shards": int, "shards_trained": int     # hanya jika shards > 0
         }
 
     Raises:
+        ValueError  : Jika model_format atau dtype tidak dikenal.
         RuntimeError: Jika belum ada data terdaftar atau tidak ada gambar.
     """
-    labels = lbl.load()
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f"model_format harus salah satu dari: {', '.join(MODEL_FORMATS)}")
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype harus salah satu dari: {', '.join(DTYPES)}")
+    if shards < 0:
+        raise ValueError("shards tidak boleh negatif.")
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("chunk_size harus >= 1.")
+    config = config or Config()
+    with file_lock(config.model_path):
+        info = _train_locked(model_format, dtype, shards, workers, chunk_size, config,
+                             cache and hist_cache.usable(config))
+    info["peak_memory_mb"] = _peak_memory_mb()
+    return info
+
+
+def current_settings(config: Config | None = None) -> dict:
+    """Format model yang sedang aktif, sebagai argumen train() untuk melatih ulang."""
+    config = config or Config()
+    if os.path.exists(config.shards_manifest):
+        with open(config.shards_manifest, "r") as f:
+            manifest = json.load(f)
+        return {"shards": manifest["shards"], "dtype": manifest["dtype"]}
+    if os.path.exists(config.model_bin_path):
+        return {"model_format": "lbph", "dtype": Gallery.load(config.model_bin_path).dtype}
+    return {"model_format": "yml"}
+
+
+def _peak_memory_mb() -> float | None:
+    """
+    Max RSS seumur proses dalam MB (None di Windows): yang lebih besar antara
+    proses ini dan satu proses anak terbesar yang pernah selesai.
+
+    Dari ru_maxrss, jadi tidak direset per training (run sebelumnya di proses
+    yang sama ikut terhitung) dan tidak menjumlahkan worker yang berjalan
+    bersamaan. Untuk mengukur satu training, jalankan di proses baru.
+    """
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss: kilobyte di Linux, byte di macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _user_files(lid: str, config: Config | None = None) -> list[str]:
+    """Path semua foto .jpg milik satu user, terurut."""
+    config = config or Config()
+    person_dir = os.path.join(config.dataset_dir, lid)
+    if not os.path.isdir(person_dir):
+        return []
+    return [
+        os.path.join(person_dir, fname)
+        for fname in sorted(os.listdir(person_dir))
+        # lewati file sementara (.part) dari registrasi yang sedang berjalan
+        if fname.endswith(".jpg")
+    ]
+
+
+def _read_faces(items: list[tuple[str, int]], config: Config) -> tuple[list, list[int]]:
+    """
+    Decode daftar (path, user_id) menjadi (faces, ids) yang sudah dinormalisasi
+    seperti saat deteksi; file rusak dilewati.
+    """
+    faces, ids, settings = [], [], {}
+    for img_path, user_id in items:
+        face = load_stored_face(img_path, config.face_size, config.equalize_hist, settings)
+        if face is not None:
+            faces.append(face)
+            ids.append(user_id)
+    return faces, ids
+
+
+def _iter_chunks(items: list[tuple[str, int]], chunk_size: int, config: Config):
+    """Yield (faces, ids) per `chunk_size` file; chunk sebelumnya sudah bisa dibebaskan."""
+    for start in range(0, len(items), chunk_size):
+        faces, ids = _read_faces(items[start:start + chunk_size], config)
+        if faces:
+            yield faces, ids
+
+
+def _fit(recognizer, items: list[tuple[str, int]], config: Config) -> int:
+    """Latih `recognizer` dengan semua gambar sekaligus. Return jumlah gambar yang dipakai."""
+    faces, ids = _read_faces(items, config)
+    if faces:
+        recognizer.train(faces, np.array(ids))
+    return len(faces)
+
+
+def _build_gallery(
+    items: list[tuple[str, int]],
+    chunk_size: int | None,
+    config: Config | None = None,
+) -> Gallery:
+    """
+    Gallery histogram untuk `items`.
+
+    Dengan chunk_size, histogram tiap chunk dihitung oleh recognizer sementara
+    lalu langsung ditulis ke file sementara tanpa nama di config.trainer_dir
+    (di-memory-map, dihapus otomatis saat gallery dibuang); gambar dan
+    recognizer chunk dibuang sebelum chunk berikutnya dibaca. Histogram tidak
+    pernah menumpuk di RAM, jadi gallery.save()/write_yml() yang membaca per
+    blok juga tetap terbatas.
+    """
+    config = config or Config()
+    if not chunk_size:
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        if not _fit(recognizer, items, config):
+            return Gallery(np.zeros((0, 0), dtype=np.float32), [])
+        return Gallery.from_recognizer(recognizer)
+
+    dim = (1 << lbp.NEIGHBORS) * lbp.GRID_X * lbp.GRID_Y
+    labels = np.empty(len(items), dtype=np.int32)
+    filled = 0
+    os.makedirs(config.trainer_dir, exist_ok=True)
+    with tempfile.TemporaryFile(dir=config.trainer_dir, suffix=".hist") as f:
+        # Batas atas = jumlah file; bagian yang tak terisi tidak dipakai
+        histograms = np.memmap(f, dtype=np.float32, mode="w+", shape=(max(len(items), 1), dim))
+    for faces, ids in _iter_chunks(items, chunk_size, config):
+        recognizer = cv2.face.LBPHFaceRecognizer_create(
+            lbp.RADIUS, lbp.NEIGHBORS, lbp.GRID_X, lbp.GRID_Y)
+        recognizer.train(faces, np.array(ids))
+        for row, hist in enumerate(recognizer.getHistograms(), start=filled):
+            histograms[row] = hist.ravel()
+        labels[filled:filled + len(ids)] = ids
+        filled += len(ids)
+        del faces, recognizer
+        release_pages(histograms)
+    if not filled:
+        return Gallery(np.zeros((0, 0), dtype=np.float32), [])
+    return Gallery(histograms[:filled], labels[:filled])
+
+
+
+def _remove_stale(keep: str, config: Config) -> None:
+    """Hapus artefak model format lain agar detector tidak memuat model basi."""
+    if keep != "yml" and os.path.exists(config.model_path):
+        os.remove(config.model_path)
+    if keep != "lbph" and os.path.exists(config.model_bin_path):
+        os.remove(config.model_bin_path)
+    if keep != "sharded" and os.path.isdir(config.shards_dir):
+        shutil.rmtree(config.shards_dir)
+
+
+def _train_locked(
+    model_format: str,
+    dtype: str,
+    shards: int,
+    workers: int | None,
+    chunk_size: int | None,
+    config: Config,
+    cache: bool,
+) -> dict:
+    labels = lbl.load(config)
     if not labels:
         raise RuntimeError("Belum ada data terdaftar. Daftarkan wajah terlebih dahulu.")
 
-    faces, ids = [], []
-    for lid, name in labels.items():
-        person_dir = os.path.join(DATASET_DIR, lid)
-        if not os.path.isdir(person_dir):
+    if shards > 0:
+        return _train_sharded(labels, shards, dtype, workers, chunk_size, config, cache)
+
+    items = [(path, int(lid)) for lid in labels for path in _user_files(lid, config)]
+
+    cache_info = {}
+    if cache:
+        # Model dibangun dari histogram cache; yml ditulis dari gallery yang sama
+        gallery, cache_info = hist_cache.build_gallery(items, config, chunk_size, workers)
+        total = len(gallery)
+        if not total:
+            raise RuntimeError("Tidak ada gambar ditemukan di folder dataset.")
+        if model_format == "lbph":
+            model_path = gallery.save(config.model_bin_path, dtype=dtype)
+        else:
+            model_path = write_yml(gallery, config.model_path)
+    elif model_format == "lbph" or chunk_size:
+        # Streaming: histogram per chunk di file sementara, yml juga ditulis dari situ
+        gallery = _build_gallery(items, chunk_size, config)
+        total = len(gallery)
+        if not total:
+            raise RuntimeError("Tidak ada gambar ditemukan di folder dataset.")
+        if model_format == "lbph":
+            model_path = gallery.save(config.model_bin_path, dtype=dtype)
+        else:
+            model_path = write_yml(gallery, config.model_path)
+    else:
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        total = _fit(recognizer, items, config)
+        if not total:
+            raise RuntimeError("Tidak ada gambar ditemukan di folder dataset.")
+        with atomic_path(config.model_path) as tmp:
+            recognizer.write(tmp)
+        model_path = config.model_path
+    _remove_stale(keep=model_format, config=config)
+
+    return {
+        "total_images": total,
+        "total_persons": len(labels),
+        "model_path": model_path,
+        **cache_info,
+    }
+
+
+# ─── Sharded Training ─────────────────────────────────────────────────────────
+
+def _signature(paths: list[str]) -> str:
+    """
+    Sidik jari foto satu user: path + mtime + ukuran setiap file. File yang
+    terhapus setelah daftar dibuat dianggap tidak ada.
+    """
+    digest = hashlib.sha1()
+    for img_path in paths:
+        try:
+            st = os.stat(img_path)
+        except FileNotFoundError:
             continue
-        for fname in sorted(os.listdir(person_dir)):
-            img_path = os.path.join(person_dir, fname)
-            img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-            if img is not None:
-                faces.append(img)
-                ids.append(int(lid))
-
-    if not faces:
+        digest.update(f"{img_path}:{st.st_mtime_ns}:{st.st_size}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _train_shard(job: tuple[list[tuple[str, int]], str, str, int | None, Config]) -> int:
+    """Worker proses: latih satu shard dan simpan sebagai .lbph. Return jumlah sampel."""
+    items, path, dtype, chunk_size, config = job
+    gallery = _build_gallery(items, chunk_size, config)
+    gallery.save(path, dtype=dtype)
+    return len(gallery)
+
+
+def _train_sharded(
+    labels: dict,
+    shards: int,
+    dtype: str,
+    workers: int | None,
+    chunk_size: int | None,
+    config: Config,
+    cache: bool,
+) -> dict:
+    """
+    Partisi user ke `shards` shard (user_id % shards). Shard yang isinya tidak
+    berubah sejak training terakhir (berdasarkan sidik jari per user di
+    manifest) tidak dilatih ulang.
+
+    Tanpa cache, tiap shard yang berubah dilatih di proses terpisah. Dengan
+    cache tidak ada proses per shard: histogram seluruh dataset diambil dari
+    cache (hanya foto baru yang dihitung, paralel per chunk) dan setiap shard
+    yang berubah cukup disalin dari situ.
+    """
+    groups: list[dict[str, list[str]]] = [{} for _ in range(shards)]
+    for lid in labels:
+        groups[int(lid) % shards][lid] = _user_files(lid, config)
+    if not any(paths for group in groups for paths in group.values()):
+        raise RuntimeError("Tidak ada gambar ditemukan di folder dataset.")
+
+    previous = None
+    if os.path.exists(config.shards_manifest):
+        with open(config.shards_manifest, "r") as f:
+            previous = json.load(f)
+        if previous.get("shards") != shards or previous.get("dtype") != dtype:
+            previous = None
+
+    os.makedirs(config.shards_dir, exist_ok=True)
+    entries, jobs = [], {}
+    for k, group in enumerate(groups):
+        entry = {
+            "file": f"shard-{k}.lbph",
+            "users": {lid: _signature(paths) for lid, paths in group.items()},
+        }
+        old = previous["entries"][k] if previous else None
+        if (old and old["users"] == entry["users"]
+                and os.path.exists(os.path.join(config.shards_dir, old["file"]))):
+            entry["samples"] = old["samples"]
+        else:
+            items = [(path, int(lid)) for lid, paths in group.items() for path in paths]
+            jobs[k] = (items, os.path.join(config.shards_dir, entry["file"]), dtype, chunk_size, config)
+        entries.append(entry)
+
+    cache_info = {}
+    if jobs and cache:
+        everything = [(path, int(lid)) for group in groups
+                      for lid, paths in group.items() for path in paths]
+        gallery, cache_info = hist_cache.build_gallery(everything, config, chunk_size, workers)
+        for k, job in jobs.items():
+            others = [int(lid) for j, group in enumerate(groups) if j != k for lid in group]
+            shard = gallery.without(others)
+            shard.save(job[1], dtype=dtype)
+            entries[k]["samples"] = len(shard)
+    elif jobs:
+        max_workers = min(len(jobs), workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for k, samples in zip(jobs, pool.map(_train_shard, jobs.values())):
+                entries[k]["samples"] = samples
+
+    total = sum(entry["samples"] for entry in entries)
+    if total == 0:
         raise RuntimeError("Tidak ada gambar ditemukan di folder dataset.")
 
-    recognizer = cv2.face.LBPHFaceRecognizer_create()
-    recognizer.train(faces, np.array(ids))
-    recognizer.write(MODEL_PATH)
+    # Manifest ditulis terakhir: detector hanya melihat set shard yang lengkap
+    with atomic_path(config.shards_manifest) as tmp:
+        with open(tmp, "w") as f:
+            json.dump({"shards": shards, "dtype": dtype, "entries": entries}, f, indent=2)
+    keep = {entry["file"] for entry in entries} | {os.path.basename(config.shards_manifest)}
+    for fname in os.listdir(config.shards_dir):
+        if fname.startswith("shard-") and fname not in keep:
+            os.remove(os.path.join(config.shards_dir, fname))
+    _remove_stale(keep="sharded", config=config)
 
     return {
-        "total_images": len(faces),
+        "total_images": total,
         "total_persons": len(labels),
-        "model_path": MODEL_PATH,
+        "model_path": config.shards_manifest,
+        "shards": shards,
+        "shards_trained": len(jobs),
+        **cache_info,
     }
+
+
+# ─── Hapus User dari Model ────────────────────────────────────────────────────
+
+def _removed_counts(gallery: Gallery, user_ids: set[int]) -> Counter:
+    """Jumlah sampel per user yang akan hilang jika `user_ids` dihapus dari gallery."""
+    return Counter(int(uid) for uid in gallery.labels if int(uid) in user_ids)
+
+
+def remove_users(user_ids, config: Config | None = None) -> dict[int, int]:
+    """
+    Hapus sampel milik `user_ids` langsung dari model yang tersimpan, tanpa
+    training ulang: histogram user lain disalin apa adanya, dataset tidak
+    dibaca ulang. Untuk model ter-shard hanya shard yang memuat user tersebut
+    yang ditulis ulang.
+
+    Args:
+        user_ids: ID user (int) yang akan dihapus; boleh banyak sekaligus.
+        config  : Path dan setting (None = Config() di direktori kerja).
+
+    Returns:
+        dict {user_id: jumlah sampel yang dihapus} — kosong jika belum ada model.
+    """
+    user_ids = {int(uid) for uid in user_ids}
+    removed: dict[int, int] = {uid: 0 for uid in user_ids}
+    if not user_ids:
+        return removed
+    config = config or Config()
+    with file_lock(config.model_path):
+        if os.path.exists(config.shards_manifest):
+            removed.update(_remove_from_shards(user_ids, config))
+        elif os.path.exists(config.model_bin_path):
+            gallery = Gallery.load(config.model_bin_path)
+            counts = _removed_counts(gallery, user_ids)
+            if counts:
+                gallery.without(user_ids).save(config.model_bin_path, dtype=gallery.dtype)
+            removed.update(counts)
+        elif os.path.exists(config.model_path):
+            recognizer = cv2.face.LBPHFaceRecognizer_create()
+            recognizer.read(config.model_path)
+            gallery = Gallery.from_recognizer(recognizer)
+            counts = _removed_counts(gallery, user_ids)
+            if not counts:
+                return removed
+            kept = gallery.without(user_ids)
+            if len(kept):
+                write_yml(kept, config.model_path, threshold=recognizer.getThreshold())
+            else:
+                # LBPHFaceRecognizer tidak bisa memuat model kosong; .lbph kosong bisa
+                kept.save(config.model_bin_path)
+                _remove_stale(keep="lbph", config=config)
+            removed.update(counts)
+    return removed
+
+
+def _remove_from_shards(user_ids: set[int], config: Config) -> Counter:
+    with open(config.shards_manifest, "r") as f:
+        manifest = json.load(f)
+
+    removed = Counter()
+    for entry in manifest["entries"]:
+        targets = {uid for uid in user_ids if str(uid) in entry["users"]}
+        if not targets:
+            continue
+        path = os.path.join(config.shards_dir, entry["file"])
+        gallery = Gallery.load(path)
+        kept = gallery.without(targets)
+        kept.save(path, dtype=gallery.dtype)
+        removed.update(_removed_counts(gallery, targets))
+        entry["samples"] = len(kept)
+        for uid in targets:
+            del entry["users"][str(uid)]
+
+    with atomic_path(config.shards_manifest) as tmp:
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+    return removed
@@ -5,20 +5,21 @@ Manajemen pengguna — list dan hapus.
 import os
 import shutil
 from . import labels as lbl
-from .config import DATASET_DIR
+from .config import Config
 
 
-def list_users() -> list[dict]:
+def list_users(config: Config | None = None) -> list[dict]:
     """
     Dapatkan daftar semua pengguna beserta jumlah foto dataset-nya.
 
     Returns:
         List of dict: [{"id": int, "name": str, "photos": int}, ...]
     """
-    labels = lbl.load()
+    config = config or Config()
+    labels = lbl.load(config)
     result = []
     for lid, name in sorted(labels.items(), key=lambda x: int(x[0])):
-        person_dir  = os.path.join(DATASET_DIR, lid)
+        person_dir  = os.path.join(config.dataset_dir, lid)
         photo_count = 0
         if os.path.isdir(person_dir):
             photo_count = sum(1 for f in os.listdir(person_dir) if f.endswith(".jpg"))
@@ -26,33 +27,72 @@ def list_users() -> list[dict]:
     return result
 
 
-def delete_user(name: str) -> dict:
+def delete_user(name: str, update_model: bool = True, config: Config | None = None) -> dict:
     """
     Hapus pengguna beserta seluruh data fotonya.
 
     Args:
-        name: Nama pengguna yang akan dihapus (case-insensitive).
+        name        : Nama pengguna yang akan dihapus (case-insensitive).
+        update_model: Hapus juga sampel user ini dari model yang tersimpan,
+                      sehingga tidak perlu train() ulang.
 
     Returns:
-        dict: {"id": int, "name": str, "photos_deleted": int}
+        dict: {"id": int, "name": str, "photos_deleted": int, "samples_removed": int}
 
     Raises:
         ValueError: Jika nama tidak ditemukan.
     """
-    labels = lbl.load()
-    lid_str, user_id = lbl.find_by_name(labels, name)
+    return delete_users([name], update_model=update_model, config=config)[0]
 
-    if user_id is None:
-        raise ValueError(f"Pengguna '{name}' tidak ditemukan.")
 
-    person_dir    = os.path.join(DATASET_DIR, lid_str)
-    photos_deleted = 0
+def delete_users(
+    names: list[str],
+    update_model: bool = True,
+    config: Config | None = None,
+) -> list[dict]:
+    """
+    Hapus banyak pengguna sekaligus dalam satu kali proses.
+
+    Labels disimpan sekali dan model hanya ditulis ulang sekali untuk
+    seluruh user, bukan sekali per user.
+
+    Args:
+        names       : Daftar nama pengguna (case-insensitive).
+        update_model: Hapus juga sampel mereka dari model yang tersimpan.
+
+    Returns:
+        List of dict: [{"id", "name", "photos_deleted", "samples_removed"}, ...]
+
+    Raises:
+        ValueError: Jika salah satu nama tidak ditemukan (tidak ada yang dihapus).
+    """
+    config = config or Config()
+    with lbl.locked(config) as labels:
+        found = []
+        for name in names:
+            lid_str, user_id = lbl.find_by_name(labels, name)
+            if user_id is None:
+                raise ValueError(f"Pengguna '{name}' tidak ditemukan.")
+            found.append((lid_str, user_id, name))
+
+        results = []
+        for lid_str, user_id, name in found:
+            if lid_str not in labels:
+                continue  # nama sama muncul dua kali di batch
+            person_dir    = os.path.join(config.dataset_dir, lid_str)
+            photos_deleted = 0
 
-    if os.path.isdir(person_dir):
-        photos_deleted = sum(1 for f in os.listdir(person_dir) if f.endswith(".jpg"))
-        shutil.rmtree(person_dir)
+            if os.path.isdir(person_dir):
+                photos_deleted = sum(1 for f in os.listdir(person_dir) if f.endswith(".jpg"))
+                shutil.rmtree(person_dir)
 
-    del labels[lid_str]
-    lbl.save(labels)
+            del labels[lid_str]
+            results.append({"id": user_id, "name": name, "photos_deleted": photos_deleted})
 
-    return {"id": user_id, "name": name, "photos_deleted": photos_deleted}
+    removed = {}
+    if update_model:
+        from . import trainer   # lazy: cv2/numpy hanya dimuat jika model perlu diubah
+        removed = trainer.remove_users([r["id"] for r in results], config=config)
+    for r in results:
+        r["samples_removed"] = removed.get(r["id"], 0)
+    return results